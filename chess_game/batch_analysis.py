@@ -0,0 +1,144 @@
+"""Phan tich hang loat: doc FEN/EPD tu file hoac stdin, tim nuoc di tot nhat bang
+mot nhom tien trinh engine song lau va tra ket qua ve dang JSON lines.
+
+Vi du:
+    python batch_analysis.py positions.epd --depth 3 --time 2 --workers 4
+    cat fens.txt | python batch_analysis.py --unordered > results.jsonl
+"""
+import argparse
+import json
+import multiprocessing as mp
+import os
+import queue
+import sys
+from collections import deque
+
+import chess
+
+from chess_engine import ChessEngine
+from search_api import SearchLimits
+
+# Trang thai rieng cua moi tien trinh worker (khoi tao mot lan trong _init_worker)
+_engine = None
+_search_params = None
+
+
+def parse_position(line):
+    """Doc mot dong FEN hoac EPD, tra ve (board, ops)."""
+    try:
+        return chess.Board(line), {}
+    except ValueError:
+        return chess.Board.from_epd(line)
+
+
+def _init_worker(depth, time_limit, mode, tt_size_mb):
+    """Tao engine (va cac bang cua no) mot lan cho moi worker."""
+    global _engine, _search_params
+    _engine = ChessEngine(tt_size_mb=tt_size_mb, verbose=False)
+    _search_params = (depth, time_limit, mode)
+
+
+def _analyse(task):
+    """Tim nuoc di tot nhat cho mot vi tri; loi duoc tra ve trong ket qua thay vi nem ra."""
+    index, line = task
+    result = {'index': index, 'fen': line}
+    try:
+        board, ops = parse_position(line)
+    except ValueError as e:
+        result['error'] = str(e)
+        return result
+
+    depth, time_limit, mode = _search_params
+    _engine.board = board
+    result['fen'] = board.fen()
+    try:
+        search = _engine.search(SearchLimits(depth=depth, movetime=time_limit, mode=mode))
+    except Exception as e:
+        result['error'] = repr(e)
+        return result
+    result.update({
+        'move': search.move.uci() if search.move else None,
+        'pv': [m.uci() for m in search.pv],
+        'score': search.score,
+        'depth': search.depth,
+        'nodes': search.nodes,
+        'time': round(search.time, 3),
+    })
+    if 'id' in ops:
+        result['id'] = ops['id']
+    return result
+
+
+def read_positions(stream):
+    """Bo qua dong trong va dong chu thich (#)."""
+    for line in stream:
+        line = line.strip()
+        if line and not line.startswith('#'):
+            yield line
+
+
+def analyse_stream(lines, workers=None, depth=3, time_limit=5.0, mode='minimax_full',
+                   ordered=True, max_inflight=None, tt_size_mb=16):
+    """Phan tich cac vi tri bang mot Pool tien trinh, tra ve generator ket qua.
+
+    ordered=True tra ket qua theo thu tu dau vao, nguoc lai theo thu tu hoan thanh.
+    So viec dang xu ly bi gioi han boi max_inflight (mac dinh 2 * workers), nen dau
+    vao chi duoc doc tiep khi dau ra da duoc tieu thu (backpressure)."""
+    workers = workers or os.cpu_count() or 1
+    max_inflight = max_inflight or 2 * workers
+    tasks = enumerate(lines)
+
+    with mp.Pool(workers, initializer=_init_worker,
+                 initargs=(depth, time_limit, mode, tt_size_mb)) as pool:
+        if ordered:
+            pending = deque()
+            for task in tasks:
+                if len(pending) >= max_inflight:
+                    yield pending.popleft().get()
+                pending.append(pool.apply_async(_analyse, (task,)))
+            while pending:
+                yield pending.popleft().get()
+        else:
+            done = queue.Queue()
+            inflight = 0
+            for task in tasks:
+                if inflight >= max_inflight:
+                    yield done.get()
+                    inflight -= 1
+                pool.apply_async(_analyse, (task,), callback=done.put,
+                                 error_callback=lambda e, i=task[0]: done.put({'index': i, 'error': repr(e)}))
+                inflight += 1
+            while inflight:
+                yield done.get()
+                inflight -= 1
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Phan tich hang loat FEN/EPD, xuat JSON lines.")
+    parser.add_argument('input', nargs='?', help="file FEN/EPD (mac dinh: stdin)")
+    parser.add_argument('--depth', type=int, default=3)
+    parser.add_argument('--time', type=float, default=5.0, help="gioi han giay moi vi tri")
+    parser.add_argument('--mode', default='minimax_full', choices=('minimax_full', 'minimax_pure'))
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--max-inflight', type=int, default=None)
+    parser.add_argument('--hash', type=float, default=16, help="kich thuoc TT moi worker (MB)")
+    parser.add_argument('--unordered', action='store_true', help="xuat theo thu tu hoan thanh")
+    args = parser.parse_args(argv)
+
+    stream = open(args.input) if args.input else sys.stdin
+    try:
+        results = analyse_stream(
+            read_positions(stream), workers=args.workers, depth=args.depth,
+            time_limit=args.time, mode=args.mode, ordered=not args.unordered,
+            max_inflight=args.max_inflight, tt_size_mb=args.hash,
+        )
+        for result in results:
+            sys.stdout.write(json.dumps(result) + "\n")
+            sys.stdout.flush()
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,515 @@
+"""Cac bai do hieu nang / kiem tra nhanh cho engine.
+
+    python bench.py perft [--depth 3]
+    python bench.py see [--repeat 20]
+    python bench.py order [--depth 4]
+    python bench.py selectivity [--depth 5] [--positions 6]
+    python bench.py profile [--depth 4] [--positions 4]
+    python bench.py eval [--repeat 200]
+    python bench.py levels
+    python bench.py ponder [--level Medium] [--moves 12] [--think 1.0]
+    python bench.py multipv [--depth 4] [--lines 3] [--positions 6]
+"""
+import argparse
+import cProfile
+import math
+import pstats
+import threading
+import time
+
+import chess
+
+from chess_engine import ChessEngine, DIFFICULTY_LEVELS
+from search_api import SearchLimits
+from search_position import SearchPosition, SEE_VALUES, WHITE, BLACK, PAWN, WK, WQ, BK, BQ
+
+# Cac vi tri perft chuan (chessprogramming.org/Perft_Results)
+PERFT_FENS = [
+    chess.STARTING_FEN,
+    "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1",
+    "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1",
+    "r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1",
+    "rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8",
+    "r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10",
+]
+
+# Vi tri nhieu trao doi quan (cho bench SEE)
+SEE_FENS = [
+    "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1",
+    "r1bqkb1r/pp3ppp/2np1n2/4p3/2BNP3/2N5/PPP2PPP/R1BQK2R w KQkq - 0 7",
+    "r2q1rk1/pp1bbppp/2nppn2/8/2BNP3/2N1B3/PPPQ1PPP/R4RK1 w - - 4 10",
+    "1k1r3q/1ppn3p/p4b2/4p3/8/P2N2P1/1PP1R1BP/2K1Q3 w - - 0 1",
+    "r1b1k2r/ppppnppp/2n2q2/2b5/3NP3/2P1B3/PP3PPP/RN1QKB1R w KQkq - 0 7",
+    "2r2rk1/1b2qppp/p3pn2/1p6/3NP3/1BN1Q3/PPP2PPP/3R1RK1 b - - 0 17",
+    "r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10",
+]
+
+# Morphy - Duke Karl / Count Isouard, Paris 1858 (bench sap xep nuoc)
+OPERA_GAME = ("e4 e5 Nf3 d6 d4 Bg4 dxe5 Bxf3 Qxf3 dxe5 Bc4 Nf6 Qb3 Qe7 Nc3 c6 Bg5 b5 "
+              "Nxb5 cxb5 Bxb5+ Nbd7 O-O-O Rd8 Rxd7 Rxd7 Rd1 Qe6 Bxd7+ Nxd7 Qb8+ Nxb8 Rd8#")
+
+
+def legacy_see(pos, move, values=SEE_VALUES):
+    """SEE cu (truoc khi co SearchPosition.see): mo phong bang push/pop, sinh lai nuoc
+    hop le moi lan an lai va luon an den het chuoi trao doi."""
+    target = (move >> 6) & 63
+    gains = [values[pos.board[target] & 7 or 1]]
+    pos.push(move)
+    pushed = 1
+    while True:
+        captures = [m for m in pos.legal_moves() if (m >> 6) & 63 == target and pos.is_capture(m)]
+        if not captures:
+            break
+        best = min(captures, key=lambda mv: values[pos.board[mv & 63] & 7])
+        gains.append(values[pos.board[target] & 7 or 1])
+        pos.push(best)
+        pushed += 1
+    for _ in range(pushed):
+        pos.pop()
+    net = 0
+    for i in reversed(range(len(gains))):
+        net = gains[i] - net if i % 2 == 0 else net - gains[i]
+    return net
+
+
+def legacy_material_eval(engine):
+    """Vat chat + PST cu (truoc khi co tong tang dan): quet ca ban co, tron mg/eg cho
+    tung quan voi giai doan tinh lai tu bitboard."""
+    pos = engine.pos
+    phase = 0
+    for pt, weight in ((chess.KNIGHT, 1), (chess.BISHOP, 1), (chess.ROOK, 2), (chess.QUEEN, 4)):
+        phase += (pos.bb[pt + 8].bit_count() + pos.bb[pt].bit_count()) * weight
+    phase = min(phase, 24)
+    score = 0
+    for sq in chess.SQUARES:
+        piece = pos.board[sq]
+        if not piece:
+            continue
+        pt = piece & 7
+        is_white = piece >> 3 == WHITE
+        pst_sq = sq if is_white else chess.square_mirror(sq)
+        pst = (engine.PST_MG[pt][pst_sq] * phase + engine.PST_EG[pt][pst_sq] * (24 - phase)) // 24
+        score += engine.piece_values[pt] + pst if is_white else -(engine.piece_values[pt] + pst)
+    return score
+
+
+def legacy_activity_eval(engine):
+    """Mobility, trung tam va an toan vua cu: attacks_from tung quan, attackers_mask
+    tung o trung tam va do tung o la chan tot. Tra ve (mobility, center, king_safety)."""
+    pos = engine.pos
+    mobility = 0
+    for pt in (chess.KNIGHT, chess.BISHOP, chess.ROOK, chess.QUEEN, chess.KING):
+        for color, sign in ((WHITE, 1), (BLACK, -1)):
+            for sq in chess.scan_forward(pos.bb[pt + 8 * color]):
+                mobility += sign * pos.attacks_from(sq).bit_count() * engine.mobility_weights[pt]
+    center = 0
+    for sq in (chess.D4, chess.D5, chess.E4, chess.E5):
+        if pos.board[sq]:
+            center += 30 if pos.board[sq] >> 3 == WHITE else -30
+        center += (pos.attackers_mask(WHITE, sq).bit_count() - pos.attackers_mask(BLACK, sq).bit_count()) * 8
+
+    def penalty(king_sq, color):
+        if king_sq < 0:
+            return 0
+        file, rank = chess.square_file(king_sq), chess.square_rank(king_sq)
+        pen = 60 if rank in (3, 4) or file in (3, 4) else 0
+        front_rank, start_rank = (rank + 1, 1) if color == WHITE else (rank - 1, 6)
+        for f in (file - 1, file, file + 1):
+            if 0 <= f <= 7 and 0 <= front_rank <= 7 and pos.board[chess.square(f, front_rank)] != PAWN + 8 * color:
+                pen += 20
+        if rank == start_rank and file == 4:
+            if (color == WHITE and pos.castling & WK or pos.castling & WQ) or \
+                    (color == BLACK and pos.castling & BK or pos.castling & BQ):
+                pen += 20
+        return pen
+
+    king_safety = penalty(pos.king_square(BLACK), BLACK) - penalty(pos.king_square(WHITE), WHITE)
+    return mobility, center, king_safety
+
+
+def legacy_evaluate(engine):
+    """evaluate_board cu ghep tu cac thanh phan cu (cau truc tot da chung minh trung khop)."""
+    mobility, center, king_safety = legacy_activity_eval(engine)
+    phase = engine._get_game_phase_taper()
+    return (legacy_material_eval(engine) + engine._bishop_pair_eval() + mobility +
+            engine._pawn_structure_eval() + center + (king_safety * phase // 24 if phase > 4 else 0))
+
+
+def board_perft(board, depth):
+    if depth == 0:
+        return 1
+    nodes = 0
+    for move in board.legal_moves:
+        board.push(move)
+        nodes += board_perft(board, depth - 1)
+        board.pop()
+    return nodes
+
+
+def bench_perft(depth):
+    """So sanh perft cua SearchPosition voi python-chess (so node phai bang nhau)."""
+    ok = True
+    for fen in PERFT_FENS:
+        board = chess.Board(fen)
+        t0 = time.perf_counter()
+        expected = board_perft(board, depth)
+        t1 = time.perf_counter()
+        got = SearchPosition.from_board(board).perft(depth)
+        t2 = time.perf_counter()
+        status = "OK" if got == expected else "SAI"
+        ok = ok and got == expected
+        print(f"{status:4} d={depth} nodes={got:>9} python-chess {t1 - t0:6.2f}s | SearchPosition {t2 - t1:6.2f}s  {fen}")
+    return ok
+
+
+def bench_see(repeat):
+    """Do toc do SEE bitboard (see, see_ge) so voi SEE cu tren cac nuoc an quan."""
+    cases = []
+    for fen in SEE_FENS:
+        pos = SearchPosition.from_board(chess.Board(fen))
+        cases += [(pos, m) for m in pos.generate_captures() if pos.is_capture(m)]
+
+    def timed(fn):
+        t0 = time.perf_counter()
+        for _ in range(repeat):
+            for pos, m in cases:
+                fn(pos, m)
+        return (time.perf_counter() - t0) / (repeat * len(cases)) * 1e6
+
+    t_old = timed(legacy_see)
+    t_see = timed(lambda pos, m: pos.see(m))
+    t_ge = timed(lambda pos, m: pos.see_ge(m, 0))
+    print(f"{len(cases)} nuoc an quan tren {len(SEE_FENS)} vi tri")
+    print(f"SEE cu (push/pop + legal_moves): {t_old:8.1f} us/nuoc")
+    print(f"see() bitboard                  : {t_see:8.1f} us/nuoc  (x{t_old / t_see:.1f})")
+    print(f"see_ge(move, 0) bitboard        : {t_ge:8.1f} us/nuoc  (x{t_old / t_ge:.1f})")
+
+
+def game_positions(moves=OPERA_GAME, start=4):
+    """Cac vi tri cung ben di (moi 2 ply) doc theo mot van dau, nhu engine gap trong GUI."""
+    board = chess.Board()
+    fens = []
+    for i, san in enumerate(moves.split()):
+        if i >= start and i % 2 == 0:
+            fens.append(board.fen())
+        board.push_san(san)
+    return fens
+
+
+def run_fixed_depth(engine, fens, depth):
+    """Tim kiem do sau co dinh lan luot cac vi tri, tra ve tong (nodes, time, cutoffs,
+    so nuoc truoc khi cat, so lan cat o nuoc dau)."""
+    nodes = cutoffs = cutoff_moves = first = 0
+    t0 = time.perf_counter()
+    for fen in fens:
+        engine.board = chess.Board(fen)
+        engine.best_move(depth=depth, time_limit=1e9)
+        nodes += engine.nodes_searched
+        cutoffs += engine.cutoffs
+        cutoff_moves += engine.cutoff_moves
+        first += engine.first_move_cutoffs
+    return nodes, time.perf_counter() - t0, cutoffs, cutoff_moves, first
+
+
+# Do lech toi da cho phep giua evaluate_board va danh gia cu (lam tron vat chat + PST)
+EVAL_TOLERANCE = 2
+
+
+def bench_eval(repeat):
+    """Toc do danh gia (evals/s) va do lech so voi danh gia cu tren cac vi tri perft,
+    SEE va van dau mau. Tra ve False neu lech qua EVAL_TOLERANCE."""
+    engine = ChessEngine(verbose=False)
+    fens = PERFT_FENS + SEE_FENS + game_positions(start=0)
+    positions = []
+    max_diff = max_activity_diff = max_eval_diff = 0
+    for fen in fens:
+        engine.board = chess.Board(fen)
+        pos = engine._sync_position()
+        positions.append(pos)
+        max_diff = max(max_diff, abs(engine._material_eval() - legacy_material_eval(engine)))
+        new, old = engine._activity_eval(), legacy_activity_eval(engine)
+        max_activity_diff = max(max_activity_diff, *(abs(a - b) for a, b in zip(new, old)))
+        max_eval_diff = max(max_eval_diff, abs(engine.evaluate_board() - legacy_evaluate(engine)))
+
+    def timed(fn):
+        t0 = time.perf_counter()
+        for _ in range(repeat):
+            for pos in positions:
+                engine.pos = pos
+                fn()
+        return repeat * len(positions) / (time.perf_counter() - t0)
+
+    old = timed(lambda: legacy_material_eval(engine))
+    new = timed(engine._material_eval)
+    old_activity = timed(lambda: legacy_activity_eval(engine))
+    new_activity = timed(engine._activity_eval)
+    old_full = timed(lambda: legacy_evaluate(engine))
+    full = timed(engine.evaluate_board)
+    engine.close()
+    print(f"{len(positions)} vi tri, lech toi da so voi cach cu: vat chat + PST {max_diff} cp | "
+          f"mobility/trung tam/vua {max_activity_diff} cp | evaluate_board {max_eval_diff} cp "
+          f"(cho phep {EVAL_TOLERANCE})")
+    print(f"vat chat + PST quet ban co : {old:10.0f} evals/s")
+    print(f"vat chat + PST tang dan    : {new:10.0f} evals/s  (x{new / old:.1f})")
+    print(f"mobility/trung tam/vua cu  : {old_activity:10.0f} evals/s")
+    print(f"_activity_eval 1 lan duyet : {new_activity:10.0f} evals/s  (x{new_activity / old_activity:.1f})")
+    print(f"evaluate_board cu          : {old_full:10.0f} evals/s")
+    print(f"evaluate_board             : {full:10.0f} evals/s  (x{full / old_full:.1f})")
+    return max_eval_diff <= EVAL_TOLERANCE
+
+
+def bench_order(depth, fens=None):
+    """Chat luong sap xep nuoc: tim kiem do sau co dinh lan luot cac vi tri cua mot
+    van dau (bang heuristic giu lai giua cac nuoc nhu khi choi that), in ty le cat
+    tia o nuoc dau va so nuoc trung binh truoc khi cat."""
+    fens = fens or game_positions()
+    engine = ChessEngine(verbose=False)
+    nodes, elapsed, cutoffs, cutoff_moves, first = run_fixed_depth(engine, fens, depth)
+    engine.close()
+    print(f"d={depth} {len(fens)} vi tri: nodes={nodes} time={elapsed:.2f}s cutoffs={cutoffs} "
+          f"nuoc dau={100 * first / max(1, cutoffs):.1f}% TB nuoc truoc cat={cutoff_moves / max(1, cutoffs):.2f}")
+
+
+# Cap do kho cu (do sau + thoi gian thuc) de so sanh voi DIFFICULTY_LEVELS
+LEGACY_LEVELS = {
+    "Easy": {'depth': 2, 'time': 0.5, 'mode': 'minimax_pure'},
+    "Medium": {'depth': 3, 'time': 1.0, 'mode': 'minimax_full'},
+    "Difficult": {'depth': 5, 'time': 5.0, 'mode': 'minimax_full'},
+}
+
+
+def percentile(values, p):
+    """Phan vi p (0..100) theo hang gan nhat."""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)]
+
+
+def bench_levels():
+    """Thoi gian CPU moi nuoc (trung binh, p99) cua tung cap do kho tren cac vi tri co dinh."""
+    fens = game_positions() + SEE_FENS
+    for title, levels in (("cu (do sau + thoi gian)", LEGACY_LEVELS), ("ngan sach node", DIFFICULTY_LEVELS)):
+        print(f"Cap do {title}, {len(fens)} vi tri:")
+        for name, config in levels.items():
+            engine = ChessEngine(verbose=False)
+            cpu, nodes = [], []
+            for fen in fens:
+                engine.board = chess.Board(fen)
+                t0 = time.process_time()
+                engine.best_move(depth=config['depth'], time_limit=config['time'], mode=config['mode'],
+                                 node_limit=config.get('nodes'))
+                cpu.append(time.process_time() - t0)
+                nodes.append(engine.nodes_searched)
+            engine.close()
+            print(f"  {name:10} CPU TB {1000 * sum(cpu) / len(cpu):7.1f} ms  p99 {1000 * percentile(cpu, 99):7.1f} ms"
+                  f"  | nodes TB {sum(nodes) / len(nodes):8.0f}  max {max(nodes):6}")
+
+
+def play_ponder_game(config, moves, think, ponder):
+    """Engine (Den) dau voi doi thu la mot engine thu hai (Trang); doi thu 'suy nghi'
+    think giay moi nuoc. Nuoc cua doi thu duoc tinh truoc khi engine ponder de hai
+    lan tim kiem khong tranh GIL. Tra ve (do sau tung nuoc, nodes tung nuoc, so ponderhit)."""
+    engine = ChessEngine(verbose=False)
+    opponent = ChessEngine(verbose=False)
+    limits = SearchLimits(depth=config['depth'], nodes=config['nodes'], movetime=config['time'],
+                          mode='minimax_full')
+    board = chess.Board()
+    depths, nodes, hits = [], [], 0
+    opponent.board = board.copy()
+    reply = opponent.search(limits).move
+    for _ in range(moves):
+        time.sleep(think) # engine ponder trong luc doi thu suy nghi
+        board.push(reply)
+        if board.is_game_over():
+            break
+        engine.board = board.copy()
+        result = engine.ponderhit(board, limits)
+        if result is not None:
+            hits += 1
+        else:
+            result = engine.search(limits)
+        depths.append(result.depth)
+        nodes.append(result.nodes)
+        board.push(result.move)
+        if board.is_game_over():
+            break
+        opponent.board = board.copy()
+        reply = opponent.search(limits).move
+        if ponder and len(result.pv) >= 2:
+            predicted = board.copy()
+            predicted.push(result.pv[1])
+            if not predicted.is_game_over():
+                engine.start_ponder(predicted)
+    engine.close()
+    opponent.close()
+    return depths, nodes, hits
+
+
+# ponderhit chi gioi han do sau phai tra ve ngay (do sau da tim xong trong luc ponder)
+PONDERHIT_DEPTH = 2
+PONDERHIT_MAX_TIME = 1.0
+
+
+def ponderhit_depth_only(think):
+    """ponderhit voi SearchLimits(depth=...) khong co gioi han thoi gian / node: tim
+    kiem ponder vo han phai dung o do sau yeu cau thay vi chay den MAX_SEARCH_DEPTH."""
+    engine = ChessEngine(verbose=False)
+    board = chess.Board()
+    board.push_san('e4')
+    engine.start_ponder(board)
+    time.sleep(think)
+    t0 = time.perf_counter()
+    timer = threading.Timer(5 * PONDERHIT_MAX_TIME, engine.stop) # phong khi khong dung
+    timer.start()
+    result = engine.ponderhit(board, SearchLimits(depth=PONDERHIT_DEPTH))
+    elapsed = time.perf_counter() - t0
+    timer.cancel()
+    engine.close()
+    ok = result is not None and elapsed < PONDERHIT_MAX_TIME
+    print(f"{'OK ' if ok else 'LOI'} ponderhit depth={PONDERHIT_DEPTH}: tra ve sau {elapsed:.3f}s, "
+          f"move={result.move.uci() if result else None} do sau {result.depth if result else '-'}")
+    return ok
+
+
+def bench_ponder(level, moves, think):
+    """Do sau hieu dung moi nuoc co / khong ponder trong mot van tu dau (cung cap do),
+    va kiem tra ponderhit chi co gioi han do sau."""
+    config = DIFFICULTY_LEVELS[level]
+    for ponder in (False, True):
+        depths, nodes, hits = play_ponder_game(config, moves, think, ponder)
+        print(f"{level} ponder={'bat' if ponder else 'tat'}: {len(depths)} nuoc, do sau TB "
+              f"{sum(depths) / len(depths):5.2f}, nodes TB {sum(nodes) / len(nodes):8.0f}, "
+              f"ponderhit {hits}/{len(depths)}")
+    return ponderhit_depth_only(think)
+
+
+def bench_multipv(depth, lines, positions):
+    """Chi phi Multi-PV (lines dong, do sau co dinh) so voi lines lan tim kiem doc lap
+    mot dong: moi vi tri dung engine moi de TT khong mang sang."""
+    fens = game_positions()[:positions]
+    single_nodes = multi_nodes = 0
+    single_time = multi_time = 0.0
+    for fen in fens:
+        for multipv in (1, lines):
+            engine = ChessEngine(verbose=False)
+            engine.board = chess.Board(fen)
+            t0 = time.perf_counter()
+            result = engine.search(SearchLimits(depth=depth, multipv=multipv))
+            elapsed = time.perf_counter() - t0
+            engine.close()
+            if multipv == 1:
+                single_nodes += result.nodes
+                single_time += elapsed
+            else:
+                multi_nodes += result.nodes
+                multi_time += elapsed
+    print(f"d={depth} {len(fens)} vi tri:")
+    print(f"  1 dong       : nodes={single_nodes:>9} time={single_time:7.2f}s")
+    print(f"  {lines} dong lan luot: nodes={lines * single_nodes:>9} time={lines * single_time:7.2f}s (uoc tinh)")
+    print(f"  Multi-PV {lines}   : nodes={multi_nodes:>9} time={multi_time:7.2f}s "
+          f"(x{multi_time / single_time:.2f} so voi 1 dong, "
+          f"{100 * multi_time / (lines * single_time):.0f}% cua {lines} lan tim)")
+
+
+# Cac cau hinh cat tia chon loc: (ten, null move, LMR, LMP)
+SELECTIVITY_CONFIGS = [
+    ("tat ca tat", False, False, False),
+    ("null move", True, False, False),
+    ("LMR", False, True, False),
+    ("LMP", False, False, True),
+    ("tat ca bat", True, True, True),
+]
+
+
+def bench_selectivity(depth, positions):
+    """Thoi gian den do sau co dinh voi tung ky thuat cat tia chon loc bat rieng."""
+    fens = game_positions()[:positions]
+    base = None
+    for name, null_move, lmr, lmp in SELECTIVITY_CONFIGS:
+        engine = ChessEngine(verbose=False)
+        engine.use_null_move, engine.use_lmr, engine.use_lmp = null_move, lmr, lmp
+        nodes, elapsed, _, _, _ = run_fixed_depth(engine, fens, depth)
+        engine.close()
+        base = base or elapsed
+        print(f"{name:12} d={depth} {len(fens)} vi tri: nodes={nodes:>9} time={elapsed:7.2f}s "
+              f"(x{base / elapsed:.2f})")
+
+
+# Ham can theo doi trong profile theo node: sinh nuoc, kiem tra ket thuc van, danh gia
+PROFILE_FUNCS = (
+    'generate_captures', 'generate_quiets', 'legal_moves', 'has_legal_move',
+    'is_insufficient_material', 'is_repetition_draw',
+    'evaluate_board', 'see_ge',
+)
+
+
+def bench_profile(depth, positions):
+    """So lan goi moi node cua cac ham sinh nuoc / kiem tra ket thuc van (cProfile)."""
+    fens = game_positions()[:positions]
+    engine = ChessEngine(verbose=False)
+    profiler = cProfile.Profile()
+    profiler.enable()
+    nodes, elapsed, _, _, _ = run_fixed_depth(engine, fens, depth)
+    profiler.disable()
+    engine.close()
+    stats = pstats.Stats(profiler).stats
+    calls = {}
+    for (filename, _, name), (_, ncalls, tottime, cumtime, _) in stats.items():
+        if name in PROFILE_FUNCS and filename.endswith(('search_position.py', 'chess_engine.py')):
+            prev = calls.get(name, (0, 0.0))
+            calls[name] = (prev[0] + ncalls, prev[1] + cumtime)
+    print(f"d={depth} {len(fens)} vi tri: nodes={nodes} time={elapsed:.2f}s (co profiler)")
+    for name in PROFILE_FUNCS:
+        n, cum = calls.get(name, (0, 0.0))
+        print(f"  {name:26} {n:>9} lan  {n / max(1, nodes):6.3f}/node  {cum:7.2f}s")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest='command', required=True)
+    p = sub.add_parser('perft', help="perft parity voi python-chess")
+    p.add_argument('--depth', type=int, default=3)
+    p = sub.add_parser('see', help="toc do SEE bitboard so voi SEE cu")
+    p.add_argument('--repeat', type=int, default=20)
+    p = sub.add_parser('order', help="ty le cat tia o nuoc dau (chat luong sap xep)")
+    p.add_argument('--depth', type=int, default=4)
+    p = sub.add_parser('selectivity', help="thoi gian den do sau voi null move / LMR / LMP")
+    p.add_argument('--depth', type=int, default=5)
+    p.add_argument('--positions', type=int, default=6)
+    p = sub.add_parser('profile', help="so lan goi ham sinh nuoc / ket thuc van moi node")
+    p.add_argument('--depth', type=int, default=4)
+    p.add_argument('--positions', type=int, default=4)
+    p = sub.add_parser('eval', help="toc do danh gia va do lech so voi danh gia cu")
+    p.add_argument('--repeat', type=int, default=200)
+    sub.add_parser('levels', help="thoi gian CPU moi nuoc (TB, p99) theo cap do kho")
+    p = sub.add_parser('ponder', help="do sau moi nuoc co / khong ponder")
+    p.add_argument('--level', default='Medium', choices=list(DIFFICULTY_LEVELS))
+    p.add_argument('--moves', type=int, default=12)
+    p.add_argument('--think', type=float, default=1.0)
+    p = sub.add_parser('multipv', help="chi phi Multi-PV so voi nhieu lan tim mot dong")
+    p.add_argument('--depth', type=int, default=4)
+    p.add_argument('--lines', type=int, default=3)
+    p.add_argument('--positions', type=int, default=6)
+    args = parser.parse_args(argv)
+
+    if args.command == 'perft':
+        raise SystemExit(0 if bench_perft(args.depth) else 1)
+    if args.command == 'see':
+        bench_see(args.repeat)
+    if args.command == 'order':
+        bench_order(args.depth)
+    if args.command == 'selectivity':
+        bench_selectivity(args.depth, args.positions)
+    if args.command == 'profile':
+        bench_profile(args.depth, args.positions)
+    if args.command == 'eval':
+        raise SystemExit(0 if bench_eval(args.repeat) else 1)
+    if args.command == 'levels':
+        bench_levels()
+    if args.command == 'ponder':
+        raise SystemExit(0 if bench_ponder(args.level, args.moves, args.think) else 1)
+    if args.command == 'multipv':
+        bench_multipv(args.depth, args.lines, args.positions)
+
+
+if __name__ == "__main__":
+    main()
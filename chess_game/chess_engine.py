@@ -1,35 +1,274 @@
 import chess
+import chess.polyglot
+import math
 import time
 import random
+import threading
 import collections 
-from collections import defaultdict
+from array import array
+
+from move_picker import MovePicker, STAGE_QUIETS
+from time_manager import TimeManager, CHECK_INTERVAL
+from search_api import SearchLimits, SearchInfo, SearchResult, PVLine, MAX_SEARCH_DEPTH, console_logger
+from search_position import (
+    SearchPosition, decode_move, move_uci, bishop_attacks, rook_attacks,
+    PAWN_ATTACKS, KNIGHT_ATTACKS, KING_ATTACKS, BB_FILE_A, BB_FILE_H,
+    WHITE, BLACK, PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING, WK, WQ, BK, BQ,
+)
+
+MAX_PLY = 128
+# Gioi han gia tri history (cap nhat gravity) va bonus moi lan cat tia
+HISTORY_MAX = 16384
+HISTORY_BONUS_MAX = 2048
+# Diem nguyen: chieu het = MATE_SCORE - so ply tu root, moi diem |x| >= MATE_BOUND la chieu het
+MATE_SCORE = 99999
+MATE_BOUND = MATE_SCORE - MAX_PLY
+INF = MATE_SCORE + 1
+DRAW_SCORE = 0
+# Aspiration window (centipawn) quanh diem cua vong lap truoc
+ASPIRATION_WINDOW = 50
+ASPIRATION_MIN_DEPTH = 3
+# Null move pruning: do sau toi thieu (R = 2 + depth/4 + min(2, (eval - beta)/200))
+NULL_MOVE_MIN_DEPTH = 3
+# Late move reduction: LMR_TABLE[depth][so thu tu nuoc], bot di history/LMR_HISTORY_DIVISOR
+LMR_MIN_DEPTH = 3
+LMR_MIN_MOVES = 3
+LMR_HISTORY_DIVISOR = 8192
+LMR_TABLE = [[0] * 64] + [[0] + [int(0.75 + math.log(d) * math.log(m) / 2.25) for m in range(1, 64)]
+                          for d in range(1, 64)]
+# Late move pruning: so nuoc toi da duoc tim o do sau 1, 2, 3 (node khong PV, khong bi chieu)
+LMP_MOVE_COUNTS = (0, 6, 10, 16)
+# Delta pruning trong qsearch: bien an toan them vao gia tri quan bi an
+DELTA_MARGIN = 200
+# Cap do kho theo ngan sach node moi nuoc: chi phi CPU moi nuoc on dinh, khong phu
+# thuoc tai cua may. 'depth' la do sau toi da, 'time' chi la gioi han thoi gian du phong.
+# Ngan sach tang dan theo cap do. Easy (minimax_pure, khong cat tia) chi tim do sau 1:
+# do sau 2 can toi ~360k node tren tap bench.py levels, con do sau 1 can toi ~8k node
+# (qsearch cua vi tri chien thuat), nen 10000 node du de luon tim xong thay vi tra ve
+# nuoc cua mot vong do dang. Hai cap con lai dung iterative deepening, ngan sach lon hon.
+DIFFICULTY_LEVELS = {
+    # MODE 'minimax_pure': Minimax cơ bản (chậm và yếu)
+    "Easy": {'depth': 1, 'nodes': 10000, 'time': 2.0, 'mode': 'minimax_pure'},
+    # MODE 'minimax_full': Minimax + Alpha-Beta (tốt)
+    "Medium": {'depth': 32, 'nodes': 12000, 'time': 3.0, 'mode': 'minimax_full'},
+    # MODE 'minimax_full': Minimax + Alpha-Beta + Nâng cao (rất tốt)
+    "Difficult": {'depth': 32, 'nodes': 30000, 'time': 8.0, 'mode': 'minimax_full'},
+}
+# Giai doan van co: trong so theo loai quan (Ma 1, Tuong 1, Xe 2, Hau 4), toi da 24.
+# PHASE_SCALE doi giai doan sang thang 0..256 de tron mg/eg bang mot phep nhan va dich bit
+MAX_PHASE = 24
+PHASE_WEIGHTS = (0, 0, 1, 1, 2, 4, 0)
+PHASE_SCALE = [(p << 8) // MAX_PHASE for p in range(MAX_PHASE + 1)]
+# Mat na bitboard tinh san cho cau truc tot. Chi so mau giong python-chess (Den 0, Trang 1)
+FILE_MASKS = chess.BB_FILES
+ADJACENT_FILE_MASKS = [(FILE_MASKS[f - 1] if f > 0 else 0) | (FILE_MASKS[f + 1] if f < 7 else 0)
+                       for f in range(8)]
+# Cac hang phia truoc mot hang theo huong tien cua moi ben: [mau][hang]
+_FORWARD_RANKS = [
+    [sum(chess.BB_RANKS[:r]) for r in range(8)],
+    [sum(chess.BB_RANKS[r + 1:]) for r in range(8)],
+]
+# Tot o sq la tot thong neu khong co tot doi phuong trong PASSED_PAWN_MASKS[mau][sq]
+PASSED_PAWN_MASKS = [[_FORWARD_RANKS[c][sq >> 3] & (FILE_MASKS[sq & 7] | ADJACENT_FILE_MASKS[sq & 7])
+                      for sq in range(64)] for c in (BLACK, WHITE)]
+# Moi o tot o sq co the tan cong khi tien len (attack span)
+PAWN_ATTACK_SPANS = [[_FORWARD_RANKS[c][sq >> 3] & ADJACENT_FILE_MASKS[sq & 7]
+                      for sq in range(64)] for c in (BLACK, WHITE)]
+# Trung tam (d4, d5, e4, e5) cho kiem soat trung tam
+CENTER_MASK = chess.BB_D4 | chess.BB_D5 | chess.BB_E4 | chess.BB_E5
+CENTER_OCCUPY_BONUS = 30
+CENTER_ATTACK_BONUS = 8
+# An toan vua: 3 o ngay truoc vua (la chan tot) [mau][o vua], vua o 2 hang / 2 cot giua
+KING_SHIELD_MASKS = [[(chess.BB_RANKS[(sq >> 3) + (1 if c == WHITE else -1)]
+                       if 0 <= (sq >> 3) + (1 if c == WHITE else -1) <= 7 else 0) &
+                      (FILE_MASKS[sq & 7] | ADJACENT_FILE_MASKS[sq & 7])
+                      for sq in range(64)] for c in (BLACK, WHITE)]
+KING_CENTER_MASK = chess.BB_RANK_4 | chess.BB_RANK_5 | chess.BB_FILE_D | chess.BB_FILE_E
+KING_CENTER_PENALTY = 60
+KING_SHIELD_PENALTY = 20
+KING_UNCASTLED_PENALTY = 20
+# Diem cau truc tot
+DOUBLED_PAWN_PENALTY = 25
+ISOLATED_PAWN_PENALTY = 20
+PASSED_PAWN_BONUS = 25
+PASSED_PAWN_RANK_BONUS = 15
+PROTECTED_PAWN_BONUS = 10
+
 
 class TranspositionTable:
     """Lop bang luu cac trang thai da danh gia de tang toc do.
-    Gom : Exact,Lower, Upper"""
-    def __init__(self):
-        self.table = {}
-    
-    def store(self,key,depth,flag,score,best_move):
-        current = self.table.get(key)
-        
-        # giu lai entry tot hon (tie-breaking: prefer deeper searches)
-        if current is None or depth >= current[0]:
-            self.table[key] = (depth,flag,score,best_move)
-            
-    def probe(self,key,depth,alpha,beta,engine_instance=None):
+    Gom : Exact,Lower, Upper
+
+    Bang co kich thuoc co dinh theo ngan sach MB, luu trong mot mang phang
+    cap phat truoc. Moi slot la 2 word 64-bit: khoa Zobrist XOR du lieu (de xac minh)
+    va mot so nguyen dong goi move(16) | score(20) | depth(8) | flag(2) | generation(8).
+    Luu khoa ^ du lieu giup bang dung chung giua cac tien trinh ma khong can khoa:
+    entry bi ghi do dang (torn write) se khong khop khoa va bi bo qua.
+    Moi bucket co BUCKET_SIZE slot: cac slot dau uu tien do sau (depth-preferred),
+    slot cuoi luon bi ghi de (always-replace). Generation tang moi lan tim kiem
+    de cac entry cu bi thay the truoc."""
+    BUCKET_SIZE = 4
+    SLOT_WORDS = 2
+    SLOT_BYTES = 8 * SLOT_WORDS
+
+    SCORE_SHIFT = 16
+    SCORE_OFFSET = 1 << 19
+    DEPTH_SHIFT = 36
+    FLAG_SHIFT = 44
+    GEN_SHIFT = 46
+
+    FLAG_CODES = {'EXACT': 1, 'LOWER': 2, 'UPPER': 3}
+    FLAG_NAMES = (None, 'EXACT', 'LOWER', 'UPPER')
+
+    def __init__(self, size_mb=16, buffer=None):
+        """buffer: vung nho ngoai (vd. SharedMemory.buf) co kich thuoc nbytes(size_mb);
+        neu None thi cap phat mang rieng cho tien trinh nay."""
+        n_buckets = self.num_buckets_for(size_mb)
+        self.size_mb = size_mb
+        self.num_buckets = n_buckets
+        self.bucket_mask = n_buckets - 1
+        self.bucket_words = self.SLOT_WORDS * self.BUCKET_SIZE
+        n_words = n_buckets * self.bucket_words
+        if buffer is None:
+            self._raw = None
+            self.table = array('Q', bytes(8 * n_words))
+        else:
+            self._raw = memoryview(buffer)[:8 * n_words]
+            self.table = self._raw.cast('Q')
+        self.generation = 0
+        self.reset_stats()
+
+    @classmethod
+    def num_buckets_for(cls, size_mb):
+        bucket_bytes = cls.SLOT_BYTES * cls.BUCKET_SIZE
+        n_buckets = max(1, int(size_mb * 1024 * 1024) // bucket_bytes)
+        # lam tron xuong luy thua cua 2 de lay chi so bang phep AND
+        return 1 << (n_buckets.bit_length() - 1)
+
+    @classmethod
+    def nbytes(cls, size_mb):
+        """So byte can cho bang size_mb (dung de cap phat shared memory)."""
+        return cls.num_buckets_for(size_mb) * cls.BUCKET_SIZE * cls.SLOT_BYTES
+
+    def clear(self):
+        """Xoa toan bo bang (chi dung khi bat dau van moi)."""
+        if self._raw is None:
+            self.table = array('Q', bytes(8 * len(self.table)))
+        else:
+            self._raw[:] = bytes(len(self._raw))
+        self.generation = 0
+
+    def release(self):
+        """Nha view tren buffer ngoai de shared memory co the dong."""
+        if self._raw is not None:
+            self.table.release()
+            self._raw.release()
+            self._raw = None
+            self.table = array('Q')
+
+    def new_search(self):
+        """Tang generation de lam cu cac entry cua nuoc di truoc."""
+        self.generation = (self.generation + 1) & 0xFF
+
+    def reset_stats(self):
+        self.probes = 0
+        self.hits = 0
+        self.stores = 0
+        self.collisions = 0
+
+    def _find(self, key):
+        """Tra ve du lieu dong goi cua slot co khoa trung, hoac 0."""
+        self.probes += 1
+        t = self.table
+        base = (key & self.bucket_mask) * self.bucket_words
+        for i in range(base, base + self.bucket_words, self.SLOT_WORDS):
+            data = t[i + 1]
+            if data and t[i] ^ data == key:
+                self.hits += 1
+                return data
+        return 0
+
+    def _unpack(self, data):
+        move = data & 0xFFFF
+        score = ((data >> self.SCORE_SHIFT) & 0xFFFFF) - self.SCORE_OFFSET
+        depth = (data >> self.DEPTH_SHIFT) & 0xFF
+        flag = self.FLAG_NAMES[(data >> self.FLAG_SHIFT) & 3]
+        return depth, flag, score, move
+
+    def store(self,key,depth,flag,score,best_move,ply=0):
+        """Luu ket qua; diem chieu het duoc doi sang khoang cach tinh tu vi tri nay (ply)."""
+        move = best_move or 0
+        if score >= MATE_BOUND:
+            score += ply
+        elif score <= -MATE_BOUND:
+            score -= ply
+        score = max(-self.SCORE_OFFSET + 1, min(self.SCORE_OFFSET - 1, int(score)))
+        depth = max(0, min(255, depth))
+        gen = self.generation
+        t = self.table
+        base = (key & self.bucket_mask) * self.bucket_words
+        end = base + self.bucket_words
+        self.stores += 1
+
+        # 1. Cung vi tri: giu lai entry tot hon (tie-breaking: prefer deeper searches)
+        for i in range(base, end, self.SLOT_WORDS):
+            data = t[i + 1]
+            if data and t[i] ^ data == key:
+                old_depth = (data >> self.DEPTH_SHIFT) & 0xFF
+                old_gen = (data >> self.GEN_SHIFT) & 0xFF
+                if depth < old_depth and old_gen == gen:
+                    return
+                if not move:
+                    move = data & 0xFFFF # khong lam mat nuoc di tot cu
+                data = self._pack(move, score, depth, flag, gen)
+                t[i] = key ^ data
+                t[i + 1] = data
+                return
+
+        # 2. Slot uu tien do sau: chon slot trong, hoac slot "re" nhat (nong + cu)
+        always_slot = end - self.SLOT_WORDS
+        victim = -1
+        victim_worth = 1 << 30
+        for i in range(base, always_slot, self.SLOT_WORDS):
+            data = t[i + 1]
+            if not data:
+                victim, victim_worth = i, -1
+                break
+            age = (gen - (data >> self.GEN_SHIFT)) & 0xFF
+            worth = ((data >> self.DEPTH_SHIFT) & 0xFF) - 8 * age
+            if worth < victim_worth:
+                victim, victim_worth = i, worth
+        if victim < 0 or depth < victim_worth:
+            # 3. Khong du sau: ghi vao slot always-replace
+            victim = always_slot
+        if t[victim + 1]:
+            self.collisions += 1
+        data = self._pack(move, score, depth, flag, gen)
+        t[victim] = key ^ data
+        t[victim + 1] = data
+
+    def _pack(self, move, score, depth, flag, gen):
+        return (move
+                | ((score + self.SCORE_OFFSET) << self.SCORE_SHIFT)
+                | (depth << self.DEPTH_SHIFT)
+                | (self.FLAG_CODES[flag] << self.FLAG_SHIFT)
+                | (gen << self.GEN_SHIFT))
+
+    def probe(self,key,depth,alpha,beta,ply=0):
         """Tra TT de xem co the su dung ket qua truoc do khong."""
-        entry = self.table.get(key)
-        if entry is None:
+        data = self._find(key)
+        if not data:
             return None
-        edepth,flag,val,mmove = entry
-        
-        if engine_instance:
-            engine_instance.tt_hits += 1
-        
+        edepth,flag,val,mmove = self._unpack(data)
+
         if edepth < depth:
             return None # Do sau khong du lon
-            
+        if val >= MATE_BOUND:
+            val -= ply
+        elif val <= -MATE_BOUND:
+            val += ply
+
+        mmove = mmove or None
         if flag == 'EXACT':
             return val, mmove,flag
         if flag == 'LOWER' and val >= beta:
@@ -38,9 +277,147 @@ class TranspositionTable:
             return val, mmove,flag
         return None
 
+    def probe_exact(self, key):
+        """(depth, score, move) cua entry EXACT co nuoc di (ket qua root da luu), hoac None."""
+        data = self._find(key)
+        if not data:
+            return None
+        depth, flag, score, move = self._unpack(data)
+        if flag != 'EXACT' or not move:
+            return None
+        return depth, score, move
+
+    def probe_move(self, key):
+        """Chi lay nuoc di tot nhat da luu (dung cho sap xep nuoc di), bat ke do sau."""
+        data = self._find(key)
+        if not data:
+            return None
+        return (data & 0xFFFF) or None
+
+    def hashfull(self):
+        """Ty le lap day theo phan nghin (kieu UCI), lay mau 1000 slot dau voi generation hien tai."""
+        t = self.table
+        n = min(1000, len(t) // self.SLOT_WORDS)
+        used = 0
+        for i in range(0, n * self.SLOT_WORDS, self.SLOT_WORDS):
+            data = t[i + 1]
+            if data and (data >> self.GEN_SHIFT) & 0xFF == self.generation:
+                used += 1
+        return used * 1000 // n
+
+    def stats(self):
+        return {
+            'probes': self.probes,
+            'hits': self.hits,
+            'stores': self.stores,
+            'collisions': self.collisions,
+            'hashfull': self.hashfull(),
+        }
+
+# Ket qua cau truc tot: diem (goc nhin Trang) va cac mat na dan xuat. passed,
+# half_open_files, attack_spans danh so theo mau [Den, Trang]; open_files va
+# half_open_files la bitboard gom ca cot.
+PawnEntry = collections.namedtuple(
+    'PawnEntry', ['score', 'passed', 'open_files', 'half_open_files', 'attack_spans'])
+
+
+class PawnHashTable:
+    """Bang bam cau truc tot anh xa truc tiep, kich thuoc co dinh (so entry la luy
+    thua cua 2). Khoa la khoa Zobrist chi gom tot (SearchPosition.pawn_key), luu day
+    du de xac minh; cau truc tot it thay doi giua cac node anh em nen ty le trung cao."""
+    DEFAULT_ENTRIES = 1 << 14
+
+    def __init__(self, entries=DEFAULT_ENTRIES):
+        size = 1
+        while size * 2 <= entries:
+            size *= 2
+        self.mask = size - 1
+        self.keys = [None] * size
+        self.entries = [None] * size
+        self.reset_stats()
+
+    def clear(self):
+        self.keys = [None] * len(self.keys)
+        self.entries = [None] * len(self.entries)
+
+    def reset_stats(self):
+        self.probes = 0
+        self.hits = 0
+
+    def probe(self, key):
+        self.probes += 1
+        i = key & self.mask
+        if self.keys[i] == key:
+            self.hits += 1
+            return self.entries[i]
+        return None
+
+    def store(self, key, entry):
+        i = key & self.mask
+        self.keys[i] = key
+        self.entries[i] = entry
+
+    def hit_rate(self):
+        return self.hits / self.probes if self.probes else 0.0
+
+
+class EvalCache:
+    """Cache danh gia tinh anh xa truc tiep theo khoa Zobrist, kich thuoc theo MB.
+    Moi slot la mot word 64-bit: tag (32 bit cao cua khoa, de xac minh) | diem + SCORE_OFFSET.
+    Chi so slot lay tu cac bit thap cua khoa nen tag va chi so doc lap nhau.
+    Diem danh gia chi phu thuoc vi tri nen entry khong bao gio cu, khong can xoa giua
+    cac lan tim kiem."""
+    SCORE_BITS = 32
+    SCORE_OFFSET = 1 << 31
+    DEFAULT_MB = 4
+
+    def __init__(self, size_mb=DEFAULT_MB):
+        size = 1
+        while size * 2 * 8 <= size_mb * 1024 * 1024:
+            size *= 2
+        self.mask = size - 1
+        self.table = array('Q', bytes(8 * size))
+        self.reset_stats()
+
+    def clear(self):
+        self.table = array('Q', bytes(8 * len(self.table)))
+
+    def reset_stats(self):
+        self.probes = 0
+        self.hits = 0
+        self.misses = 0
+        self.miss_time = 0.0   # tong thoi gian evaluate_board khi truot (de uoc luong thoi gian tiet kiem)
+
+    def probe(self, key):
+        """Diem da luu cho key, hoac None."""
+        self.probes += 1
+        word = self.table[key & self.mask]
+        if word and word >> self.SCORE_BITS == key >> 32:
+            self.hits += 1
+            return (word & 0xFFFFFFFF) - self.SCORE_OFFSET
+        return None
+
+    def store(self, key, score):
+        self.table[key & self.mask] = (key >> 32) << self.SCORE_BITS | (score + self.SCORE_OFFSET)
+
+    def hit_rate(self):
+        return self.hits / self.probes if self.probes else 0.0
+
+    def time_saved(self):
+        """Uoc luong thoi gian tiet kiem: so lan trung * thoi gian danh gia trung binh."""
+        return self.hits * self.miss_time / self.misses if self.misses else 0.0
+
+
 class ChessEngine:
-    def __init__(self):
-        print("--- 100% ĐANG CHẠY CODE ENGINE MỚI NHẤT! ---")
+    def __init__(self, tt_size_mb=16, workers=1, verbose=True, eval_cache_mb=EvalCache.DEFAULT_MB,
+                 logger=None):
+        # verbose=False: khong in gi ra stdout (dung cho phan tich hang loat).
+        # logger (logging.Logger hoac doi tuong co .info) thay cho stdout; None + verbose=False
+        # thi khong dinh dang / in gi ca
+        self.verbose = verbose
+        self.logger = logger if logger is not None else (console_logger() if verbose else None)
+        if self.logger is not None:
+            self.logger.info("--- 100% ĐANG CHẠY CODE ENGINE MỚI NHẤT! ---")
         self.board = chess.Board()
 
         
@@ -66,18 +443,68 @@ class ChessEngine:
             chess.KING: 1 
         }
         
+        # Gia tri quan theo loai quan (chi so 0 = o trong) cho SEE
+        self.see_values = [0] + [self.piece_values[pt] for pt in chess.PIECE_TYPES]
+
         self._init_piece_square_tables()
         
-        self._init_zobrist()
-        self.tt = TranspositionTable()
-        self.killers = defaultdict(lambda: [None, None]) 
-        self.history = defaultdict(int) 
+        self.tt = TranspositionTable(tt_size_mb)
+        self.pawn_table = PawnHashTable()
+        self.eval_cache = EvalCache(eval_cache_mb)
+        # Vi tri tim kiem (bitboard + mailbox), dung lai tu self.board o root moi lan tim
+        self.pos = None
+        # Bat len de assert khoa Zobrist tang dan == khoa tinh lai (cham, chi dung khi debug)
+        self.debug_zobrist = False
+        # Bat len de assert tong vat chat/PST/giai doan tang dan == quet ca ban co moi lan danh gia
+        self.debug_eval = False
+        # Killer, history, counter-move, continuation history: mang so nguyen cap phat
+        # san, duoc lao hoa (khong xoa) giua cac lan tim kiem
+        self.clear_heuristics()
         
-        self.stop_time = None
+        # Quan ly thoi gian: dong ho chi duoc doc moi CHECK_INTERVAL node
+        self.time_manager = None
+        self.stopped = False        # da het gio / co lenh dung: moi node tra ve None
+        self.next_time_check = 0    # so node se doc dong ho lan tiep theo
+        self.partial_root = None    # (move, diem) tot nhat da tim tron ven cua vong lap bi ngat
+        self._stop_event = threading.Event() # stop() tu luong khac, kiem tra moi CHECK_INTERVAL node
+        self._info_callback = None  # callback SearchInfo sau moi vong lap (ChessEngine.search)
+        # --- PONDER: tim kiem nuoc tra loi du doan o luong nen ---
+        self._ponder_thread = None
+        self._ponder_board = None
+        self._ponder_result = None
+        self._ponderhit_limits = None # do ponderhit() dat, luong tim kiem ap dung trong _check_stop
+        self.depth_limit = None # do sau toi da cua lan tim kiem dang chay (ponderhit co the ha xuong)
+        # --- CAT TIA CHON LOC (bat/tat rieng tung ky thuat de do) ---
+        self.use_null_move = True
+        self.use_lmr = True
+        self.use_lmp = True
+        # --- LAZY SMP ---
+        # workers: tong so tien trinh tim kiem (1 = chi tien trinh chinh)
+        self.workers = workers
+        self.smp = None
+        self.stop_flag = None   # co dung dung chung (RawValue) cho helper
+        self.order_noise = 0    # nhieu ngau nhien trong sap xep de helper di nhanh khac nhau
         # --- METRICS (ĐO LƯỜNG) ---
         self.nodes_searched = 0
         self.tt_hits = 0
+        self.cutoffs = 0            # so lan cat tia beta trong negamax
+        self.cutoff_moves = 0       # tong so nuoc da thu truoc (va ke ca) nuoc gay cat tia
+        self.first_move_cutoffs = 0 # so lan cat tia ngay o nuoc dau tien
         self.last_completed_depth = 0
+        self.last_score = None
+        self.root_move = 0          # nuoc tot nhat o root cua lan _search_root gan nhat
+        self.root_moves = []        # [move, diem, so node cay con] cua cac nuoc o root
+        self.pv = [[] for _ in range(MAX_PLY + 1)] # bang PV tam giac: pv[ply] = PV tu ply
+        self.qnodes = 0             # so node qsearch (da tinh trong nodes_searched)
+        self.delta_pruned = 0       # nuoc an bi bo trong qsearch do delta pruning
+        self.see_pruned = 0         # nuoc an bi bo trong qsearch do SEE < 0
+        self.null_cutoffs = 0       # so lan cat bang null move
+        self.lmr_reductions = 0     # so nuoc duoc giam do sau (LMR)
+        self.lmr_researches = 0     # so lan LMR phai tim lai du do sau
+        self.lmp_pruned = 0         # so nuoc yen tinh bi bo qua (LMP)
+        self.pv_line = []           # PV cua do sau hoan thanh cuoi cung (nuoc so nguyen)
+        self.last_pv = []           # PV cua lan best_move gan nhat (chess.Move)
+        self.aspiration_researches = 0
         # ------------------------
 
 
@@ -85,73 +512,40 @@ class ChessEngine:
     def print_board(self):
         print(self.board)
 
-    def _init_zobrist(self):
-        """Khoi tao bang Zobrist cho hash nhanh."""
-        self.zobrist_piece = {}
-        for pt in (chess.PAWN,chess.KNIGHT,chess.BISHOP,chess.ROOK,chess.QUEEN,chess.KING):
-            for color in (chess.WHITE,chess.BLACK):
-                for sq in chess.SQUARES:
-                    self.zobrist_piece[(pt,color,sq)] = random.getrandbits(64)
-        self.zobrist_side = random.getrandbits(64)
-        self.zobrist_castle = {
-            'K' : random.getrandbits(64),
-            'Q' : random.getrandbits(64),
-            'k' : random.getrandbits(64),
-            'q' : random.getrandbits(64),
-        }
-        self.zobrist_ep = [random.getrandbits(64) for _ in range(8)]
-        
     def zobrist_hash(self):
-        """Tinh hash Zobrist cho trang thai hien tai cua ban co."""
-        h =0
-        for sq in chess.SQUARES:
-            piece = self.board.piece_at(sq)
-            if piece:
-                h ^= self.zobrist_piece[(piece.piece_type,piece.color,sq)]
-        if self.board.turn == chess.BLACK:
-            h ^= self.zobrist_side
-        if self.board.has_kingside_castling_rights(chess.WHITE):
-            h ^= self.zobrist_castle['K']
-        if self.board.has_queenside_castling_rights(chess.WHITE):
-            h ^= self.zobrist_castle['Q']
-        if self.board.has_kingside_castling_rights(chess.BLACK):
-            h ^= self.zobrist_castle['k']
-        if self.board.has_queenside_castling_rights(chess.BLACK):
-            h ^= self.zobrist_castle['q']
-        ep = self.board.ep_square
-        if ep is not None:
-            f = chess.square_file(ep)
-            h ^= self.zobrist_ep[f]
-        return h
-        
-        
+        """Hash Zobrist (Polyglot) cua self.board; trong tim kiem dung self.pos.key (tang dan)."""
+        return chess.polyglot.zobrist_hash(self.board)
+
+    def _sync_position(self, board=None):
+        """Dung lai vi tri tim kiem tu board (mac dinh self.board, chi goi o root)."""
+        self.pos = SearchPosition.from_board(board if board is not None else self.board)
+        self.pos.debug = self.debug_zobrist
+        self.pos.set_eval_tables(self.psq_mg, self.psq_eg, self.phase_weights)
+        return self.pos
+
     #---------------------------------------
     # 1. EVALUATION ENTRY POINT
     #---------------------------------------
     def evaluate_board(self):
-    
-        # Kiểm tra trạng thái kết thúc trò chơi
-        if self.board.is_checkmate():
-            return -99999 if self.board.turn == chess.WHITE else 99999
-        # Xử lý các trường hợp hòa: Tuyệt đối không thay đổi dòng này.
-        if self.board.is_stalemate() or self.board.is_insufficient_material() or self.board.is_fifty_moves() or self.board.is_repetition():
-            return 0
+        """Danh gia vi tri tim kiem hien tai (self.pos), diem theo goc nhin Trang."""
 
+        # Danh gia tinh thuan tuy: chieu het, het nuoc va cac truong hop hoa do
+        # vong tim kiem phat hien (danh sach nuoc rong, halfmove, chu ky vat chat, lap lai).
+        if self.debug_eval:
+            self._check_eval()
         game_phase = self._get_game_phase_taper()
             
         material_pst = self._material_eval() # Bao gồm vật chất và PST
         
         # Bổ sung các yếu tố đánh giá chuyên nghiệp
         bishop_pair = self._bishop_pair_eval() # Điểm cặp Tượng
-        mobility = self._mobility_eval() 
+        # Mobility, trung tâm và an toàn vua tính chung một lần duyệt bitboard
+        mobility, center, king_safety = self._activity_eval()
         pawn_struct = self._pawn_structure_eval()
-        center = self._center_control_eval()
-        king_safety = self._king_safety_eval() 
         
         # Áp dụng Tapering cho King Safety (chỉ quan trọng ở Trung cuộc)
-        max_phase = 24
         # King safety chỉ áp dụng nếu game chưa quá tàn cuộc
-        tapered_king_safety = (king_safety * game_phase) // max_phase if game_phase > 4 else 0
+        tapered_king_safety = (king_safety * game_phase) // MAX_PHASE if game_phase > 4 else 0
 
         score = (
             material_pst + 
@@ -164,13 +558,26 @@ class ChessEngine:
         
         return int(score)
     
+    def cached_eval(self):
+        """evaluate_board() qua cache danh gia theo khoa Zobrist (goc nhin Trang)."""
+        cache = self.eval_cache
+        key = self.pos.key
+        score = cache.probe(key)
+        if score is None:
+            t0 = time.perf_counter()
+            score = self.evaluate_board()
+            cache.miss_time += time.perf_counter() - t0
+            cache.misses += 1
+            cache.store(key, score)
+        return score
+
     # --- PHƯƠNG THỨC BỔ SUNG ĐIỂM CẶP TƯỢNG ---
     def _bishop_pair_eval(self):
         """Thưởng điểm cho việc sở hữu cặp Tượng (Bishop Pair)."""
         score = 0
         
-        white_bishops = len(self.board.pieces(chess.BISHOP, chess.WHITE))
-        black_bishops = len(self.board.pieces(chess.BISHOP, chess.BLACK))
+        white_bishops = self.pos.bb[BISHOP + 8].bit_count()
+        black_bishops = self.pos.bb[BISHOP].bit_count()
         
         if white_bishops >= 2:
             score += self.BISHOP_PAIR_BONUS
@@ -181,121 +588,120 @@ class ChessEngine:
     
     # --- PSTS, MOBILITY, PAWN STRUCTURE, KING SAFETY (GIỮ NGUYÊN) ---
 
-    def _mobility_eval(self):
-        """Đánh giá khả năng di chuyển của các quân cờ"""
-        score = 0
-        for sq,piece in self.board.piece_map().items():
-            if piece.piece_type == chess.PAWN:
-                continue
-            
-            attacks = len(self.board.attacks(sq))
-            w = self.mobility_weights.get(piece.piece_type, 0)
-            
-            if piece.color == chess.WHITE:
-                score += attacks * w
+    def _activity_eval(self):
+        """Mobility, kiem soat trung tam va an toan vua trong mot lan duyet bitboard.
+        Tap o tan cong cua moi quan chi tinh mot lan va dung chung cho mobility
+        (popcount) va trung tam (popcount & CENTER_MASK). Tra ve (mobility, center,
+        king_safety) theo goc nhin Trang."""
+        pos = self.pos
+        bb = pos.bb
+        occupied = pos.occupied
+        weights = self.mobility_weights
+        castling = pos.castling
+        mobility = center = king_safety = 0
+        for color, sign in ((WHITE, 1), (BLACK, -1)):
+            c = 8 * color
+            mob = 0
+            center_attacks = 0
+            for sq in chess.scan_forward(bb[KNIGHT + c]):
+                attacks = KNIGHT_ATTACKS[sq]
+                mob += weights[KNIGHT] * attacks.bit_count()
+                center_attacks += (attacks & CENTER_MASK).bit_count()
+            for sq in chess.scan_forward(bb[BISHOP + c]):
+                attacks = bishop_attacks(sq, occupied)
+                mob += weights[BISHOP] * attacks.bit_count()
+                center_attacks += (attacks & CENTER_MASK).bit_count()
+            for sq in chess.scan_forward(bb[ROOK + c]):
+                attacks = rook_attacks(sq, occupied)
+                mob += weights[ROOK] * attacks.bit_count()
+                center_attacks += (attacks & CENTER_MASK).bit_count()
+            for sq in chess.scan_forward(bb[QUEEN + c]):
+                attacks = bishop_attacks(sq, occupied) | rook_attacks(sq, occupied)
+                mob += weights[QUEEN] * attacks.bit_count()
+                center_attacks += (attacks & CENTER_MASK).bit_count()
+
+            # Tot: tan cong hai duong cheo tinh cho ca nhom bang dich bit
+            pawns = bb[PAWN + c]
+            if color == WHITE:
+                left, right = (pawns & ~BB_FILE_A) << 7, (pawns & ~BB_FILE_H) << 9
             else:
-                score -= attacks * w
-        return score
+                left, right = (pawns & ~BB_FILE_A) >> 9, (pawns & ~BB_FILE_H) >> 7
+            center_attacks += (left & CENTER_MASK).bit_count() + (right & CENTER_MASK).bit_count()
 
-    def _pawn_structure_eval(self):
-        """Đánh giá cấu trúc tốt (Doubled, Isolated, Passed, Protected)."""
-        score = 0
-        
-        white_pawns = set(self.board.pieces(chess.PAWN, chess.WHITE))
-        black_pawns = set(self.board.pieces(chess.PAWN, chess.BLACK))
-        
-        white_pawn_piece = chess.Piece(chess.PAWN, chess.WHITE)
-        black_pawn_piece = chess.Piece(chess.PAWN, chess.BLACK)
+            king_sq = bb[KING + c].bit_length() - 1
+            penalty = 0
+            if king_sq >= 0:
+                attacks = KING_ATTACKS[king_sq]
+                mob += weights[KING] * attacks.bit_count()
+                center_attacks += (attacks & CENTER_MASK).bit_count()
+                # An toàn vua: vua ở giữa bàn, thiếu lá chắn tốt, chưa nhập thành
+                if KING_CENTER_MASK >> king_sq & 1:
+                    penalty += KING_CENTER_PENALTY
+                shield = KING_SHIELD_MASKS[color][king_sq]
+                penalty += KING_SHIELD_PENALTY * (shield & ~pawns).bit_count()
+                if king_sq == (chess.E2 if color == WHITE else chess.E7) and \
+                        castling & (WQ | BQ | (WK if color == WHITE else BK)):
+                    penalty += KING_UNCASTLED_PENALTY
 
-        pawn_files_white = [chess.square_file(sq) for sq in white_pawns]
-        pawn_files_black = [chess.square_file(sq) for sq in black_pawns]
-        
-        # 1. Xử lý Tốt Chồng (Doubled)
-        doubled_penalty = 25
-        white_file_counts = collections.Counter(pawn_files_white)
-        black_file_counts = collections.Counter(pawn_files_black)
-        
-        for count in white_file_counts.values():
-            if count > 1:
-                score -= doubled_penalty * (count - 1)
-        
-        for count in black_file_counts.values():
-            if count > 1:
-                score += doubled_penalty * (count - 1)
-        
-        # 2. Xử lý Tốt Cô Lập (Isolated)
-        isolated_penalty = 20
-        white_file_set = set(pawn_files_white)
-        black_file_set = set(pawn_files_black)
-        
-        for f in white_file_set:
-            if (f - 1) not in white_file_set and (f + 1) not in white_file_set:
-                score -= isolated_penalty * white_file_counts[f]
-        
-        for f in black_file_set:
-            if (f - 1) not in black_file_set and (f + 1) not in black_file_set:
-                score += isolated_penalty * black_file_counts[f]
-
-        # Hàm is_passed
-        def is_passed(sq, color, my_pawns, enemy_pawns):
-            f = chess.square_file(sq)
-            r = chess.square_rank(sq)
-        
-            for ep in enemy_pawns:
-                ef = chess.square_file(ep)
-                er = chess.square_rank(ep)
-                if abs(ef - f) <= 1:
-                    if (color == chess.WHITE and er > r) or (color == chess.BLACK and er < r):
-                        return False
-            return True
-
-        # 3. Xử lý Tốt Thông (Passed) và Tốt Được Bảo Vệ (Protected)
-        passed_bonus = 25
-        protected_bonus = 10 
-
-        for sq in white_pawns:
-            if is_passed(sq, chess.WHITE, white_pawns, black_pawns):
-                rank = chess.square_rank(sq)
-                score += passed_bonus + (rank - 1) * 15 
-        
-            r = chess.square_rank(sq)
-            f = chess.square_file(sq)
-            if r > 0: 
-                if f > 0 and self.board.piece_at(chess.square(f - 1, r - 1)) == white_pawn_piece:
-                    score += protected_bonus
-                if f < 7 and self.board.piece_at(chess.square(f + 1, r - 1)) == white_pawn_piece:
-                    score += protected_bonus
-        
-        for sq in black_pawns:
-            if is_passed(sq, chess.BLACK, black_pawns, white_pawns):
-                rank = chess.square_rank(sq)
-                score -= (passed_bonus + (6 - rank) * 15) 
-        
-            r = chess.square_rank(sq)
-            f = chess.square_file(sq)
-            if r < 7: 
-                if f > 0 and self.board.piece_at(chess.square(f - 1, r + 1)) == black_pawn_piece:
-                    score -= protected_bonus
-                if f < 7 and self.board.piece_at(chess.square(f + 1, r + 1)) == black_pawn_piece:
-                    score -= protected_bonus
+            mobility += sign * mob
+            center += sign * (CENTER_ATTACK_BONUS * center_attacks +
+                              CENTER_OCCUPY_BONUS * (pos.occ[color] & CENTER_MASK).bit_count())
+            king_safety -= sign * penalty
+        return mobility, center, king_safety
 
-        return score
+    def _pawn_structure_eval(self):
+        """Đánh giá cấu trúc tốt (Doubled, Isolated, Passed, Protected).
+        Tra bang bam tot theo pos.pawn_key, chi tinh lai khi cau truc tot thay doi."""
+        pos = self.pos
+        key = pos.pawn_key
+        entry = self.pawn_table.probe(key)
+        if entry is None:
+            entry = self._pawn_entry(pos.bb[PAWN], pos.bb[PAWN + 8])
+            self.pawn_table.store(key, entry)
+        return entry.score
 
-    def _center_control_eval(self):
-        """Đánh giá kiểm soát trung tâm (d4, d5, e4, e5)"""
+    @staticmethod
+    def _pawn_entry(black_pawns, white_pawns):
+        """Tinh diem cau truc tot va cac mat na bang mat na bitboard tinh san theo o."""
         score = 0
-        center_squares = (chess.D4, chess.D5, chess.E4, chess.E5)
-        
-        for sq in center_squares:
-            p = self.board.piece_at(sq)
-            if p:
-                score += 30 if p.color == chess.WHITE else -30
-                
-            white_attackers = len(self.board.attackers(chess.WHITE, sq))
-            black_attackers = len(self.board.attackers(chess.BLACK, sq))
-            score += (white_attackers - black_attackers) * 8
-            
-        return score
+        pawns_by_color = (black_pawns, white_pawns)
+        passed = [0, 0]
+        spans = [0, 0]
+        files = [0, 0]
+        for color, sign in ((WHITE, 1), (BLACK, -1)):
+            pawns = pawns_by_color[color]
+            enemy_pawns = pawns_by_color[color ^ 1]
+            passed_masks = PASSED_PAWN_MASKS[color]
+            attack_spans = PAWN_ATTACK_SPANS[color]
+            # Tot bao ve: tot cung mau o o ma tot doi phuong dung tai sq se tan cong
+            guard = PAWN_ATTACKS[color ^ 1]
+            s = 0
+            for sq in chess.scan_forward(pawns):
+                f = sq & 7
+                files[color] |= FILE_MASKS[f]
+                spans[color] |= attack_spans[sq]
+                # 1. Tốt Cô Lập (Isolated)
+                if not pawns & ADJACENT_FILE_MASKS[f]:
+                    s -= ISOLATED_PAWN_PENALTY
+                # 2. Tốt Thông (Passed)
+                if not enemy_pawns & passed_masks[sq]:
+                    passed[color] |= 1 << sq
+                    relative_rank = sq >> 3 if color == WHITE else 7 - (sq >> 3)
+                    s += PASSED_PAWN_BONUS + (relative_rank - 1) * PASSED_PAWN_RANK_BONUS
+                # 3. Tốt Được Bảo Vệ (Protected)
+                s += PROTECTED_PAWN_BONUS * (guard[sq] & pawns).bit_count()
+            # 4. Tốt Chồng (Doubled): moi tot thua tren cung mot cot
+            s -= DOUBLED_PAWN_PENALTY * (pawns.bit_count() - (files[color] & chess.BB_RANK_1).bit_count())
+            score += sign * s
+
+        pawn_files = files[BLACK] | files[WHITE]
+        return PawnEntry(
+            score=score,
+            passed=passed,
+            open_files=chess.BB_ALL & ~pawn_files,
+            half_open_files=[files[WHITE] & ~files[BLACK], files[BLACK] & ~files[WHITE]],
+            attack_spans=spans,
+        )
 
     def _init_piece_square_tables(self): 
         """Khởi tạo PSTs (Piece Square Tables) cho Trung cuộc (MG) và Tàn cuộc (EG)."""
@@ -404,279 +810,259 @@ class ChessEngine:
         chess.QUEEN: QUEEN_PST,
         chess.KING: KING_EG_PST 
         }
-    
+        self._build_psq_tables()
+
+    def _build_psq_tables(self):
+        """Bang phang [ma quan * 64 + o] = +/-(gia tri quan + PST) cho trung cuoc va tan
+        cuoc (Den mang dau am, o lat doc), va trong so giai doan [ma quan]. SearchPosition
+        cong/tru cac o nay khi push/pop nen khong phai quet ban co moi lan danh gia."""
+        self.psq_mg = [0] * (16 * 64)
+        self.psq_eg = [0] * (16 * 64)
+        self.phase_weights = [0] * 16
+        for color in (WHITE, BLACK):
+            sign = 1 if color == WHITE else -1
+            for pt in chess.PIECE_TYPES:
+                code = pt + 8 * color
+                self.phase_weights[code] = PHASE_WEIGHTS[pt]
+                for sq in chess.SQUARES:
+                    pst_sq = sq if color == WHITE else chess.square_mirror(sq)
+                    self.psq_mg[code * 64 + sq] = sign * (self.piece_values[pt] + self.PST_MG[pt][pst_sq])
+                    self.psq_eg[code * 64 + sq] = sign * (self.piece_values[pt] + self.PST_EG[pt][pst_sq])
+
     def _get_game_phase_taper(self):
-        """Tính toán giai đoạn ván cờ (game phase taper)."""
-        phase_weights = {
-            chess.KNIGHT: 1,
-            chess.BISHOP: 1,
-            chess.ROOK: 2,
-            chess.QUEEN: 4
-        }
-        max_phase = 24 
-        
-        current_phase = 0
-        for piece_type in (chess.KNIGHT, chess.BISHOP, chess.ROOK, chess.QUEEN):
-            count = len(self.board.pieces(piece_type, chess.WHITE)) + len(self.board.pieces(piece_type, chess.BLACK))
-            current_phase += count * phase_weights[piece_type]
-        
-        current_phase = min(current_phase, max_phase)
-        
-        return current_phase
-    
-    
+        """Tính toán giai đoạn ván cờ (game phase taper), 0 = tàn cuộc .. 24 = khai cuộc."""
+        return min(self.pos.phase, MAX_PHASE)
+
     def _material_eval(self): 
-        """Đánh giá vật chất và bảng vị trí quân cờ (có nhận biết giai đoạn)"""
-        score = 0
-        phase = self._get_game_phase_taper()
-        max_phase = 24 
-        
-        for sq in chess.SQUARES:
-            piece = self.board.piece_at(sq)
-            if not piece:
-                continue
-        
-            val = self.piece_values[piece.piece_type]
-            mirrored_sq = chess.square_mirror(sq)
-            
-            pst_mg_score = self.PST_MG[piece.piece_type][sq if piece.color == chess.WHITE else mirrored_sq]
-            pst_eg_score = self.PST_EG[piece.piece_type][sq if piece.color == chess.WHITE else mirrored_sq]
-            
-            pst_score = ((pst_mg_score * phase) + (pst_eg_score * (max_phase - phase))) // max_phase
-            
-            if piece.color == chess.WHITE:
-                score += val + pst_score
-            else:
-                score -= (val + pst_score)
-        
-        return score
+        """Đánh giá vật chất và bảng vị trí quân cờ (có nhận biết giai đoạn).
+        Doc tong mg/eg tang dan cua self.pos, tron bang mot phep nhan va dich bit."""
+        pos = self.pos
+        eg = pos.eg
+        return eg + (((pos.mg - eg) * PHASE_SCALE[min(pos.phase, MAX_PHASE)]) >> 8)
 
-    def _king_safety_eval(self): 
-        """Đánh giá độ an toàn của vua (chủ yếu ở Trung cuộc)"""
-        score = 0
-        king_white_sq = self.board.king(chess.WHITE)
-        king_black_sq = self.board.king(chess.BLACK)
-        
-        def penalty(king_sq,color):
-            if king_sq is None:
-                return 0
-            
-            file = chess.square_file(king_sq)
-            rank = chess.square_rank(king_sq)
-            pen = 0
-            
-            if rank in(3,4) or file in(3,4):
-                pen += 60
-                
-            if color == chess.WHITE:
-                front_rank = rank + 1
-                start_rank = 1 
-            else:
-                front_rank = rank - 1
-                start_rank = 6
-                
-            for df in [-1,0,1]:
-                f = file + df
-                if 0 <= f <= 7 and 0 <= front_rank <= 7:
-                    sq = chess.square(f,front_rank)
-                    piece = self.board.piece_at(sq)
-                    if not piece or piece.piece_type != chess.PAWN or piece.color != color:
-                        pen += 20
-                        
-            if rank == start_rank and file == 4:
-                if (color == chess.WHITE and self.board.has_kingside_castling_rights(chess.WHITE) or self.board.has_queenside_castling_rights(chess.WHITE)) or \
-                    (color == chess.BLACK and self.board.has_kingside_castling_rights(chess.BLACK) or self.board.has_queenside_castling_rights(chess.BLACK)):
-                    pen += 20 
-            
-            return pen
+    def _check_eval(self):
+        """Debug: so tong tang dan cua self.pos voi ket qua quet ca ban co."""
+        pos = self.pos
+        full = pos.compute_accumulators()
+        assert (pos.mg, pos.eg, pos.phase) == full, \
+            f"Tong danh gia tang dan {(pos.mg, pos.eg, pos.phase)} != quet ban co {full} ({pos.fen()})"
 
-        score -= penalty(king_white_sq,chess.WHITE)
-        score += penalty(king_black_sq,chess.BLACK)
-        return score
-    
     def _mvv_lva_value(self,move):
         """ Ham tra ve gia tri MVV-LVA cho nuoc di (Most Valuable Victim - Least Valuable Attacker) """
-        if not self.board.is_capture(move):
+        pos = self.pos
+        if not pos.is_capture(move):
             return 0
-        victim = self.board.piece_at(move.to_square)
-        attacker = self.board.piece_at(move.from_square)
-        if not victim and self.board.is_en_passant(move):
-            victim = chess.Piece(chess.PAWN, not self.board.turn)
+        victim = pos.board[(move >> 6) & 63] & 7 or PAWN # o trong = an tot qua duong
+        attacker = pos.board[move & 63] & 7
             
-        if not victim or not attacker:
-            return 0
-            
-        v = self.piece_values.get(victim.piece_type,0)
-        a = self.piece_values.get(attacker.piece_type,0)
+        v = self.piece_values.get(victim,0)
+        a = self.piece_values.get(attacker,0)
         return 10000 + (v*10 - a) 
     
-    def static_exchange_eval(self, move):
-        """Approximate full SEE by simulating captures on a copied board."""
-        if not self.board.is_capture(move):
-            return 0
+    def see_ge(self, move, margin=0):
+        """SEE cua move >= margin (dung cho sap xep, tia qsearch, an quan xau)."""
+        return self.pos.see_ge(move, margin, self.see_values)
 
-        sim = self.board.copy()
-        
-        victim_piece = sim.piece_at(move.to_square)
-        if victim_piece is None and sim.is_en_passant(move):
-            victim_piece = chess.Piece(chess.PAWN, not sim.turn)
-            
-        victim_value = self.piece_values.get(victim_piece.piece_type, 0) if victim_piece else 0
+    # ---------------------------------------
+    # BANG HEURISTIC SAP XEP NUOC (mang phang)
+    # ---------------------------------------
+    def clear_heuristics(self):
+        """Xoa killer, history, counter-move va continuation history."""
+        self.heuristics_ply = None # ply (board.ply()) cua root lan tim kiem truoc
+        self.killers = array('i', [0]) * (2 * MAX_PLY)          # [ply][2]
+        self.history = array('i', [0]) * (2 * 64 * 64)         # [mau][from][to]
+        self.counter_moves = array('i', [0]) * (16 * 64)       # [quan vua di][o den]
+        self.cont_history = array('i', [0]) * (16 * 64 * 16 * 64) # [quan, o truoc do][quan, o den]
+        self.cont_used = set() # chi so khac 0 cua cont_history, de lao hoa khong phai quet ~1M o
 
-        gains = [victim_value]
+    def age_heuristics(self, ply=None):
+        """Lao hoa bang giua hai lan tim kiem thay vi xoa: history giam mot nua,
+        killer dich theo so ply tu root lan truoc den root nay (di tiep 2 ply thi
+        ply 2 cua lan truoc la ply 0 cua lan nay). Root lui lai (undo) hoac khong
+        ro (ply None, van moi) thi killer khong con dung cho ply nao nen bi xoa."""
+        # Chia 2 lam tron ve 0 (khong dung >> 1): diem am cung giam dan ve 0
+        self.history = array('i', [int(v / 2) for v in self.history])
+        cont = self.cont_history
+        for i in list(self.cont_used):
+            v = int(cont[i] / 2) # o am cung tro ve 0 va roi khoi tap
+            cont[i] = v
+            if not v:
+                self.cont_used.discard(i)
+        shift = -1
+        if ply is not None and self.heuristics_ply is not None:
+            shift = ply - self.heuristics_ply
+        if 0 <= shift < MAX_PLY:
+            self.killers = self.killers[2 * shift:] + array('i', [0]) * (2 * shift)
+        else:
+            self.killers = array('i', [0]) * (2 * MAX_PLY)
+        self.heuristics_ply = ply
 
-        try:
-            sim.push(move)
-        except Exception:
-            return 0
-
-        target = move.to_square
-        
-        while True:
-            captures = [m for m in sim.legal_moves if m.to_square == target and sim.is_capture(m)]
-            
-            if not captures:
-                break
-                
-            def attacker_value(mv):
-                p = sim.piece_at(mv.from_square)
-                return self.piece_values.get(p.piece_type, 0) if p else 0
-                
-            best = min(captures, key=attacker_value)
-            
-            captured = sim.piece_at(best.to_square)
-            if captured is None and sim.is_en_passant(best):
-                captured = chess.Piece(chess.PAWN, not sim.turn)
-                
-            cap_val = self.piece_values.get(captured.piece_type, 0) if captured else 0
-            gains.append(cap_val)
-            sim.push(best)
-
-        net_material = 0
-        for i in reversed(range(len(gains))):
-            gain = gains[i]
-            if i % 2 == 0: 
-                net_material = gain - net_material
-            else: 
-                net_material = net_material - gain
-        
-        return net_material
+    def new_game(self):
+        """Van moi: TT chi bi lam cu (generation moi) va history giam thay vi xoa,
+        cac vi tri khai cuoc van dung lai duoc o van sau."""
+        self.stop_ponder()
+        self.tt.new_search()
+        self.age_heuristics()
 
-    def _order_moves_improved(self, depth):
-        """Sắp xếp nước đi sử dụng nhiều heuristic để cải thiện hiệu suất tìm kiếm."""
-        moves = list(self.board.legal_moves)
-        my_color = self.board.turn
+    def killer_moves(self, ply):
+        if ply >= MAX_PLY:
+            return 0, 0
+        return self.killers[2 * ply], self.killers[2 * ply + 1]
 
-        # TT best move
-        key_tt = None
-        try:
-            h = self.zobrist_hash()
-            tt_entry = self.tt.probe(h, depth, float('-inf'), float('inf')) 
-            if tt_entry:
-                key_tt = tt_entry[1] # Lấy best_move từ TT
-        except Exception:
-            key_tt = None
+    def _prev_index(self, back=1):
+        """Chi so (quan << 6 | o den) cua nuoc di back ply truoc, -1 neu khong co
+        (hoac la nuoc rong)."""
+        stack = self.pos.stack
+        if len(stack) < back:
+            return -1
+        move, piece = stack[-back][0], stack[-back][1]
+        if not piece:
+            return -1
+        return (piece << 6) | ((move >> 6) & 63)
 
-        k1, k2 = self.killers.get(depth, [None, None])
+    def continuation_offsets(self):
+        """Vi tri bat dau trong cont_history ung voi nuoc 1 va 2 ply truoc."""
+        return [i << 10 for i in (self._prev_index(1), self._prev_index(2)) if i >= 0]
 
-        def score_move(m):
-            s = 0
-            if key_tt is not None and m == key_tt:
-                s += 100000
-                
-            s += self._mvv_lva_value(m)
-            
-            if m.promotion:
-                s += 8000
-                
-            if m == k1:
-                s += 5000
-            elif m == k2:
-                s += 4000
-                
-            if not self.board.is_capture(m):
-                s += self.history.get((m.from_square, m.to_square), 0)
-                
-            if self.board.is_capture(m):
-                see_val = self.static_exchange_eval(m)
-                if see_val < 0:
-                    s -= 20000 
-                else:
-                    s += min(2000, see_val * 8) 
-                    
-            if self.board.gives_check(m):
-                s += 100
-            if self.board.is_castling(m):
-                s += 50
-                
-            return -s 
+    def counter_move(self):
+        """Nuoc da tung cat tia de dap tra nuoc vua di (theo quan vua di va o den)."""
+        i = self._prev_index()
+        return self.counter_moves[i] if i >= 0 else 0
 
-        moves.sort(key=score_move)
-        return moves
+    def quiet_score(self, move, offsets):
+        """Diem sap xep nuoc yen tinh: butterfly history + continuation history."""
+        pos = self.pos
+        score = self.history[(pos.turn << 12) | (move & 0xFFF)]
+        index = (pos.board[move & 63] << 6) | ((move >> 6) & 63)
+        cont = self.cont_history
+        for offset in offsets:
+            score += cont[offset | index]
+        return score
 
-    def _record_killer(self,move,depth):
-        """Luu nuoc di killer vao danh sach killer moves"""
-        k1,k2 = self.killers.get(depth,(None,None))
-        if k1 is None:
-            self.killers[depth][0] = move
+    def _record_killer(self, move, ply):
+        """Luu nuoc di killer cho ply nay"""
+        if ply >= MAX_PLY:
             return
-        elif move != k1:
-            self.killers[depth][1] = k1 
-            self.killers[depth][0] = move 
-    
-    def _record_history(self,move,depth,bonus=1):
-        """Cập nhật bảng lịch sử cho nước đi"""
-        key = (move.from_square, move.to_square) 
-        self.history[key] += bonus * (1 << depth) 
+        i = 2 * ply
+        if self.killers[i] != move:
+            self.killers[i + 1] = self.killers[i]
+            self.killers[i] = move
+
+    @staticmethod
+    def _gravity(table, i, bonus):
+        """Cap nhat kieu 'gravity': gia tri tien ve +-HISTORY_MAX va khong bao gio vuot qua."""
+        v = table[i]
+        table[i] = v + bonus - v * abs(bonus) // HISTORY_MAX
 
+    def _record_history(self, move, bonus, offsets):
+        """Cong (hoac tru) bonus vao butterfly history va continuation history cua nuoc di."""
+        pos = self.pos
+        self._gravity(self.history, (pos.turn << 12) | (move & 0xFFF), bonus)
+        index = (pos.board[move & 63] << 6) | ((move >> 6) & 63)
+        used = self.cont_used
+        for offset in offsets:
+            self._gravity(self.cont_history, offset | index, bonus)
+            used.add(offset | index)
 
-    def qsearch(self, alpha, beta, is_maximizing):
-        """Tìm kiếm tĩnh (Quiescence Search)"""
+    def _record_cutoff(self, move, depth, move_count, is_quiet, quiets_tried):
+        """Cap nhat heuristic va thong ke khi nuoc thu move_count gay cat tia beta.
+        Nuoc yen tinh gay cat tia duoc thuong, cac nuoc yen tinh da thu truoc no bi phat."""
+        self.cutoffs += 1
+        self.cutoff_moves += move_count
+        if move_count == 1:
+            self.first_move_cutoffs += 1
+        if not is_quiet:
+            return
+        ply = len(self.pos.stack)
+        self._record_killer(move, ply)
+        i = self._prev_index()
+        if i >= 0:
+            self.counter_moves[i] = move
+        bonus = min(32 * depth * depth, HISTORY_BONUS_MAX)
+        offsets = self.continuation_offsets()
+        self._record_history(move, bonus, offsets)
+        for quiet in quiets_tried:
+            self._record_history(quiet, -bonus, offsets)
+
+    def qsearch(self, alpha, beta):
+        """Tìm kiếm tĩnh (Quiescence Search) dang negamax: diem theo goc nhin ben di.
+        Chi xet an quan va phong cap; bo cac nuoc an khong the nang alpha ke ca khi
+        cong them gia tri quan bi an + DELTA_MARGIN (delta pruning) va cac nuoc an
+        thua theo SEE. Ket qua duoc luu vao TT voi do sau 0."""
         self.nodes_searched += 1
-    
-        if self.stop_time is not None and time.time() > self.stop_time:
-            return None 
+        self.qnodes += 1
+        if self.nodes_searched >= self.next_time_check and self._check_stop():
+            return None
 
-        stand_pat_score = self.evaluate_board()
+        pos = self.pos
+        h = pos.key
+        ply = len(pos.stack)
+        tt_hit = self.tt.probe(h, 0, alpha, beta, ply)
+        if tt_hit is not None:
+            return tt_hit[0]
 
-        if is_maximizing:
+        if pos.is_insufficient_material():
+            return DRAW_SCORE
+
+        pinned, checkers = pos.pinned(), pos.checkers()
+        alpha_orig = alpha
+        best_move = 0
+        if checkers:
+            # Bi chieu: khong dung stand pat, xet moi nuoc thoat chieu
+            stand_pat_score = best = -INF
+            picker = MovePicker(self, self.tt.probe_move(h), ply)
+        else:
+            stand_pat_score = self.cached_eval()
+            if pos.turn == BLACK:
+                stand_pat_score = -stand_pat_score
             if stand_pat_score >= beta:
+                self.tt.store(h, 0, 'LOWER', stand_pat_score, None, ply)
                 return stand_pat_score 
             alpha = max(alpha, stand_pat_score)
-            max_eval = stand_pat_score 
-        else: 
-            if stand_pat_score <= alpha:
-                return stand_pat_score 
-            beta = min(beta, stand_pat_score)
-            min_eval = stand_pat_score 
-
-        noisy_moves = [m for m in self.board.legal_moves if m.promotion is not None or self.board.is_capture(m)]
-        
-        noisy_moves.sort(key=lambda m: -self._mvv_lva_value(m))
+            best = stand_pat_score 
+            picker = MovePicker(self, self.tt.probe_move(h), ply, quiescence=True)
+        see_values = self.see_values
 
-        for move in noisy_moves:
+        for move in picker:
+            if not checkers and not move >> 12:
+                # Delta pruning: ke ca an khong mat gi cung khong nang duoc alpha
+                victim = see_values[pos.board[(move >> 6) & 63] & 7 or PAWN]
+                if stand_pat_score + victim + DELTA_MARGIN <= alpha:
+                    self.delta_pruned += 1
+                    continue
+                # SEE pruning: an quan thua vat chat
+                if not self.see_ge(move, 0):
+                    self.see_pruned += 1
+                    continue
+            if not pos.is_legal(move, pinned, checkers):
+                continue
 
-            self.board.push(move)
-            eval_score = self.qsearch(alpha, beta, not is_maximizing) 
-            self.board.pop()
+            pos.push(move)
+            eval_score = self.qsearch(-beta, -alpha) 
+            pos.pop()
 
             if eval_score is None:
                 return None 
+            eval_score = -eval_score
 
-            if is_maximizing:
-                if eval_score > max_eval:
-                    max_eval = eval_score
-                alpha = max(alpha, eval_score)
-                if alpha >= beta:
-                    break 
-            else: 
-                if eval_score < min_eval:
-                    min_eval = eval_score
-                beta = min(beta, eval_score)
-                if alpha >= beta:
-                    break 
+            if eval_score > best:
+                best = eval_score
+                best_move = move
+                if eval_score > alpha:
+                    alpha = eval_score
+                    if alpha >= beta:
+                        break 
 
-        return max_eval if is_maximizing else min_eval
+        if best == -INF:
+            return -MATE_SCORE + ply # bi chieu het
+        if best >= beta:
+            flag = 'LOWER'
+        elif best > alpha_orig:
+            flag = 'EXACT'
+        else:
+            flag = 'UPPER'
+        self.tt.store(h, 0, flag, best, best_move, ply)
+        return best
 
     # =========================================================
     # CẤP ĐỘ DỄ: MINIMAX CƠ BẢN (KHÔNG CẮT TỈA, KHÔNG TT)
@@ -684,223 +1070,779 @@ class ChessEngine:
     def minimax_pure(self, depth, is_maximizing):
         """Minimax cổ điển (không Alpha-Beta, không TT)."""
         self.nodes_searched += 1
-        # Kiểm tra thời gian dừng
-        if self.stop_time is not None and time.time() > self.stop_time:
-            return None, None 
-        # Điểm dừng 1: Xử lý trạng thái kết thúc trò chơi
-        if self.board.is_game_over():
-            return self.evaluate_board(), None
+        # Kiểm tra thời gian dừng (đọc đồng hồ mỗi CHECK_INTERVAL node)
+        if self.nodes_searched >= self.next_time_check and self._check_stop():
+            return None, None
+        pos = self.pos
+        # Điểm dừng 1: Hòa (thiếu quân, lặp 3 lần, luật 50 nước), trừ ở root.
+        # Chiếu hết / hết nước được phát hiện khi không có nước hợp lệ nào được duyệt.
+        if pos.stack:
+            if pos.is_insufficient_material() or pos.is_repetition_draw(len(pos.stack)):
+                return DRAW_SCORE, None
+            if pos.halfmove >= 100 and (not pos.is_check() or pos.has_legal_move()):
+                return DRAW_SCORE, None
         # Điểm dừng 2: Dừng tìm kiếm theo độ sâu
         if depth == 0:
             # Dùng QSearch để ổn định đánh giá cuối cùng
-            val = self.qsearch(float('-inf'), float('inf'), is_maximizing)
+            val = self.qsearch(-INF, INF)
             if val is None:
                  return None, None
-            return val, None
+            return (val if pos.turn == WHITE else -val), None
 
         best_move = None
+        pinned, checkers = pos.pinned(), pos.checkers()
         # Cấu trúc Minimax cơ bản
         if is_maximizing:
-            max_eval = float('-inf')
-            for move in self._order_moves_improved(depth):
-                self.board.push(move)
+            max_eval = -INF
+            for move in MovePicker(self, self.tt.probe_move(pos.key), len(pos.stack)):
+                if not pos.is_legal(move, pinned, checkers):
+                    continue
+                self.pos.push(move)
                 # Gọi đệ quy không có alpha/beta
                 eval_score, _ = self.minimax_pure(depth - 1, False) 
-                self.board.pop()
+                self.pos.pop()
                 
                 if eval_score is None:
-
+                    # O root: giu nuoc tot nhat trong cac nuoc da tim xong
+                    if not pos.stack and best_move is not None:
+                        self.partial_root = (best_move, max_eval)
                     return None, None
                 # Cập nhật điểm tối đa và nước đi tốt nhất
                 if eval_score > max_eval:
                     max_eval = eval_score
                     best_move = move
+            if best_move is None:
+                return self._no_move_score(checkers), None
             return max_eval, best_move
             
         else: # is_minimizing
-            min_eval = float('inf')
-            for move in self._order_moves_improved(depth):
-                self.board.push(move)
+            min_eval = INF
+            for move in MovePicker(self, self.tt.probe_move(pos.key), len(pos.stack)):
+                if not pos.is_legal(move, pinned, checkers):
+                    continue
+                self.pos.push(move)
                 # Gọi đệ quy không có alpha/beta
                 eval_score, _ = self.minimax_pure(depth - 1, True)
-                self.board.pop()
+                self.pos.pop()
                 
                 if eval_score is None:
+                    if not pos.stack and best_move is not None:
+                        self.partial_root = (best_move, min_eval)
                     return None, None
                 
                 if eval_score < min_eval:
                     min_eval = eval_score
                     best_move = move
+            if best_move is None:
+                return self._no_move_score(checkers), None
             return min_eval, best_move
 
+    def _no_move_score(self, checkers):
+        """Diem khi khong con nuoc hop le nao: bi chieu het, hoac hoa do het nuoc.
+        Diem theo goc nhin Trang (dung cho minimax_pure)."""
+        if checkers:
+            return -MATE_SCORE if self.pos.turn == WHITE else MATE_SCORE
+        return 0
+
 
     # =========================================================
-    # CẤP ĐỘ TRUNG BÌNH/KHÓ: MINIMAX + ALPHA-BETA 
+    # CẤP ĐỘ TRUNG BÌNH/KHÓ: NEGAMAX + PVS + ALPHA-BETA 
     # =========================================================
-    def minimax_full(self, depth, alpha, beta, is_maximizing):
-        """Minimax với cắt tỉa Alpha-Beta và tất cả kỹ thuật nâng cao (TT, Killers, History)."""
+    def negamax(self, depth, alpha, beta):
+        """Negamax voi Principal Variation Search va tat ca ky thuat nang cao (TT,
+        Killers, History). Diem nguyen theo goc nhin ben di; chieu het = MATE_SCORE - ply.
+        Nuoc dau duoc tim voi cua so day du, cac nuoc sau voi cua so rong 0 va chi
+        tim lai khi vuot alpha. Tra ve None khi het gio."""
+        pos = self.pos
+        ply = len(pos.stack)
+        self.pv[ply] = []
+        if depth <= 0:
+            return self.qsearch(alpha, beta) # qsearch tu dem node va tra/luu TT
+
         self.nodes_searched += 1
-        
-        if self.stop_time is not None and time.time() > self.stop_time:
-            return None, None 
+        if self.nodes_searched >= self.next_time_check and self._check_stop():
+            return None
 
-        h = self.zobrist_hash() 
-        tt_hit = self.tt.probe(h, depth, alpha, beta) 
+        # Hòa: thiếu quân (chu ky vat chat) hoac lap lai (xem is_repetition_draw). Kiem tra
+        # truoc TT vi entry tu duong di khac khong biet vi tri nay la lap lai; khong luu
+        # TT vi phu thuoc duong di. Chiếu hết / hết nước phát hiện sau vòng lặp.
+        if pos.is_insufficient_material() or pos.is_repetition_draw(ply):
+            return DRAW_SCORE
+
+        h = pos.key
+        tt_hit = self.tt.probe(h, depth, alpha, beta, ply) 
         
         if tt_hit is not None:
             val, best_move, flag = tt_hit
-            return val, best_move
+            return val
 
-        if self.board.is_game_over():
-            val = self.evaluate_board()
-            self.tt.store(h, depth, 'EXACT', val, None)
-            return val, None
+        pinned, checkers = pos.pinned(), pos.checkers()
+        pv_node = beta - alpha > 1
+        # Luat 50 nuoc tu dong ho halfmove (bi chieu het van uu tien hon)
+        if pos.halfmove >= 100 and (not checkers or pos.has_legal_move()):
+            return DRAW_SCORE
 
-        if depth == 0:
-            val = self.qsearch(alpha, beta, is_maximizing) 
-            if val is None:
-                 return None, None
-            
-            self.tt.store(h, depth, 'EXACT', val, None) 
-            return val, None
+        # Null move pruning: bo luot ma van >= beta thi vi tri qua tot, cat ngay.
+        # Khong dung khi bi chieu, o node PV, sau mot nuoc rong, hoac khi ben di chi
+        # con vua + tot (de gap zugzwang).
+        if self.use_null_move and not pv_node and not checkers and depth >= NULL_MOVE_MIN_DEPTH and \
+                ply and pos.stack[-1][1] and pos.has_non_pawn_material(pos.turn):
+            static_eval = self.cached_eval()
+            if pos.turn == BLACK:
+                static_eval = -static_eval
+            if static_eval >= beta:
+                r = 2 + depth // 4 + min(2, (static_eval - beta) // 200)
+                pos.push_null()
+                null_score = self.negamax(depth - 1 - r, -beta, -beta + 1)
+                pos.pop_null()
+                if null_score is None:
+                    return None
+                if -null_score >= beta:
+                    self.null_cutoffs += 1
+                    return beta if -null_score >= MATE_BOUND else -null_score # khong tin chieu het tu nuoc rong
 
-        best_move = None
-        alpha_orig, beta_orig = alpha, beta 
+        best_move = 0
+        best = -INF
+        alpha_orig = alpha 
+        move_count = 0
+        quiets_tried = []
+        offsets = None
+        lmp_limit = LMP_MOVE_COUNTS[depth] if self.use_lmp and not pv_node and not checkers and \
+            depth < len(LMP_MOVE_COUNTS) else 0
+        picker = MovePicker(self, self.tt.probe_move(h), ply)
         
-        if is_maximizing:
-            max_eval = float('-inf')
-            for move in self._order_moves_improved(depth):
-                self.board.push(move)
-                eval_score, _ = self.minimax_full(depth - 1, alpha, beta, False) 
-                self.board.pop()
-                
-                if eval_score is None:
-                    return None, None 
-                
-                if eval_score > max_eval:
-                    max_eval = eval_score
-                    best_move = move
-                alpha = max(alpha, eval_score)
-                if alpha >= beta:
-                    if not self.board.is_capture(move):
-                        self._record_killer(move, depth)
-                        self._record_history(move, depth, bonus=1)
-                    break
-
-            
-            if best_move is None: 
-                return max_eval, None 
-            if max_eval <= alpha_orig:
-                flag = 'UPPER'
-            elif max_eval >= beta_orig:
-                flag = 'LOWER'
+        for move in picker:
+            if not pos.is_legal(move, pinned, checkers):
+                continue
+            move_count += 1
+            is_quiet = not move >> 12 and not pos.is_capture(move)
+            # Late move pruning: o do sau nho, bo cac nuoc yen tinh xep cuoi
+            if lmp_limit and is_quiet and move_count > lmp_limit and best > -MATE_BOUND:
+                self.lmp_pruned += 1
+                continue
+            # Late move reduction: nuoc yen tinh xep sau (khong phai killer/counter,
+            # khong chieu) duoc tim nong hon, tim lai du do sau neu vuot alpha
+            reduction = 0
+            if self.use_lmr and is_quiet and move_count > LMR_MIN_MOVES and depth >= LMR_MIN_DEPTH and \
+                    not checkers and picker.stage == STAGE_QUIETS:
+                if offsets is None:
+                    offsets = self.continuation_offsets()
+                reduction = LMR_TABLE[min(depth, 63)][min(move_count, 63)] + (not pv_node) \
+                    - self.quiet_score(move, offsets) // LMR_HISTORY_DIVISOR
+                reduction = max(0, min(reduction, depth - 2))
+            pos.push(move)
+            if move_count == 1:
+                eval_score = self.negamax(depth - 1, -beta, -alpha)
             else:
-                flag = 'EXACT'
-            self.tt.store(h, depth, flag, max_eval, best_move)
-            return max_eval, best_move
+                if reduction and pos.is_check():
+                    reduction = 0
+                if reduction:
+                    self.lmr_reductions += 1
+                    eval_score = self.negamax(depth - 1 - reduction, -alpha - 1, -alpha)
+                    if eval_score is not None and -eval_score > alpha:
+                        self.lmr_researches += 1
+                        eval_score = self.negamax(depth - 1, -alpha - 1, -alpha)
+                else:
+                    # PVS: cua so rong 0, tim lai voi cua so day du neu vuot alpha
+                    eval_score = self.negamax(depth - 1, -alpha - 1, -alpha)
+                if eval_score is not None and alpha < -eval_score < beta:
+                    eval_score = self.negamax(depth - 1, -beta, -alpha)
+            pos.pop()
             
-        else: # is_minimizing
-            min_eval = float('inf')
-            for move in self._order_moves_improved(depth):
-                self.board.push(move)
-                eval_score, _ = self.minimax_full(depth - 1, alpha, beta, True)
-                self.board.pop()
-                
-                if eval_score is None:
-                    return None, None 
-                if eval_score < min_eval:
-                    min_eval = eval_score
-                    best_move = move
-                beta = min(beta, eval_score)
-                if alpha >= beta:
-                    if not self.board.is_capture(move):
-                        self._record_killer(move, depth)
-                        self._record_history(move, depth, bonus=1)
-                    break
-            if best_move is None:
-                return min_eval, None
-            if min_eval <= alpha_orig:
-                flag = 'UPPER'
-            elif min_eval >= beta_orig:
-                flag = 'LOWER'
+            if eval_score is None:
+                return None 
+            eval_score = -eval_score
+            
+            if eval_score > best:
+                best = eval_score
+                best_move = move
+                if eval_score > alpha:
+                    alpha = eval_score
+                    self.pv[ply] = [move] + self.pv[ply + 1]
+                    if alpha >= beta:
+                        self._record_cutoff(move, depth, move_count, is_quiet, quiets_tried)
+                        break
+            if is_quiet:
+                quiets_tried.append(move)
+
+        if not move_count: 
+            best = -MATE_SCORE + ply if checkers else 0
+            self.tt.store(h, depth, 'EXACT', best, None, ply)
+            return best 
+        if best <= alpha_orig:
+            flag = 'UPPER'
+        elif best >= beta:
+            flag = 'LOWER'
+        else:
+            flag = 'EXACT'
+        self.tt.store(h, depth, flag, best, best_move, ply)
+        return best
+
+    def _check_stop(self):
+        """Goi moi CHECK_INTERVAL node: doc dong ho, ngan sach node / CPU, stop() va co dung cua Lazy SMP.
+        Khi da dung thi moi lan goi sau deu tra ve True."""
+        if self._ponderhit_limits is not None:
+            self._apply_ponderhit()
+        tm = self.time_manager
+        self.next_time_check = self.nodes_searched + CHECK_INTERVAL
+        if tm is not None and tm.node_limit is not None:
+            # Gioi han node phai chinh xac: kiem tra ngay tai moc node_limit
+            self.next_time_check = min(self.next_time_check, tm.node_limit)
+        if self.stopped or self._stop_event.is_set() or \
+                (tm is not None and tm.limit_reached(self.nodes_searched)) or \
+                (self.stop_flag is not None and self.stop_flag.value):
+            self.stopped = True
+            self.next_time_check = 0
+        return self.stopped
+
+    def _search_root(self, depth, alpha, beta, store=True):
+        """Negamax o root tren danh sach self.root_moves ([move, score, nodes]); ghi lai
+        diem va so node cua cay con moi nuoc de sap xep lai o vong lap sau.
+        store=False khi root_moves chi la mot phan nuoc hop le (Multi-PV): ket qua
+        khong phai cua vi tri nen khong ghi vao TT.
+
+        Neu bi ngat giua chung, self.partial_root giu nuoc tot nhat da duoc tim tron
+        ven (diem trong cua so, tuc la da nang alpha) de vong lap ngoai dung lai."""
+        self.nodes_searched += 1
+        self.partial_root = None
+        pos = self.pos
+        self.pv[0] = []
+        best = -INF
+        best_move = 0
+        alpha_orig = alpha
+
+        for i, root_move in enumerate(self.root_moves):
+            move = root_move[0]
+            nodes_before = self.nodes_searched
+            pos.push(move)
+            if i == 0:
+                eval_score = self.negamax(depth - 1, -beta, -alpha)
             else:
-                flag = 'EXACT'
-            self.tt.store(h, depth, flag, min_eval, best_move)
-            return min_eval, best_move
+                eval_score = self.negamax(depth - 1, -alpha - 1, -alpha)
+                if eval_score is not None and alpha < -eval_score < beta:
+                    eval_score = self.negamax(depth - 1, -beta, -alpha)
+            pos.pop()
+            if eval_score is None:
+                if best > alpha_orig:
+                    self.partial_root = (best_move, best)
+                return None
+            eval_score = -eval_score
+            root_move[1] = eval_score
+            root_move[2] = self.nodes_searched - nodes_before
+
+            if eval_score > best:
+                best = eval_score
+                best_move = move
+                if eval_score > alpha:
+                    alpha = eval_score
+                    self.pv[0] = [move] + self.pv[1]
+                    if alpha >= beta:
+                        break
+        # Cac nuoc chua duoc tim sau khi cat tia xep sau cung o vong lap sau
+        for root_move in self.root_moves[i + 1:]:
+            root_move[1] = -INF
 
+        if best <= alpha_orig:
+            flag = 'UPPER'
+        elif best >= beta:
+            flag = 'LOWER'
+        else:
+            flag = 'EXACT'
+        if store:
+            self.tt.store(pos.key, depth, flag, best, best_move, 0)
+        self.root_move = best_move
+        return best
 
-    def best_move(self, depth=3, time_limit=5.0, mode='minimax_full'): 
-        """Sử dụng thuật toán tìm kiếm tương ứng với mode và iterative deepening."""
+    def _init_root_moves(self):
+        """Nuoc hop le o root theo thu tu cua MovePicker (nuoc TT truoc)."""
+        pos = self.pos
+        pinned, checkers = pos.pinned(), pos.checkers()
+        self.root_moves = [[m, -INF, 0] for m in MovePicker(self, self.tt.probe_move(pos.key), 0)
+                           if pos.is_legal(m, pinned, checkers)]
+
+
+    def _stored_root_result(self):
+        """(depth, score, move) EXACT cua root trong TT neu nuoc di con hop le o root."""
+        stored = self.tt.probe_exact(self.pos.key)
+        if stored is None or stored[0] < 1:
+            return None
+        if not any(rm[0] == stored[2] for rm in self.root_moves):
+            return None
+        return stored
+
+    def _tt_pv(self, move, max_len):
+        """Dung lai PV tu nuoc tot nhat cua cac entry TT, bat dau bang move o root;
+        dung khi gap nuoc khong hop le hoac vi tri lap lai."""
+        pos = self.pos
+        line = []
+        seen = {pos.key}
+        while move and len(line) < max_len:
+            if not pos.is_pseudo_legal(move) or not pos.is_legal(move):
+                break
+            pos.push(move)
+            line.append(move)
+            if pos.key in seen:
+                break
+            seen.add(pos.key)
+            move = self.tt.probe_move(pos.key)
+        for _ in line:
+            pos.pop()
+        return line
+
+    def _iterative_deepening(self, depth, start_depth=1, log=True, resume=False):
+        """Iterative deepening voi negamax, tra ve (score, move) cua do sau cuoi cung
+        hoan thanh; score theo goc nhin Trang, PV day du luu trong self.pv_line.
+
+        resume: neu TT co ket qua EXACT cua root (do sau d) thi dung no lam vong lap
+        da hoan thanh va bat dau tu d+1.
+
+        Tu do sau ASPIRATION_MIN_DEPTH, moi vong lap tim voi cua so hep quanh diem
+        cua vong truoc va mo rong dan (gap doi) phia bi vuot khi fail-low/fail-high.
+        Nuoc o root duoc sap lai theo diem va so node cay con cua vong truoc."""
+        best = None
+        best_score = -INF
+        sign = 1 if self.pos.turn == WHITE else -1
+        self.pv_line = []
+        self._init_root_moves()
+        if not self.root_moves:
+            return None, None
+        if resume:
+            stored = self._stored_root_result()
+            if stored is not None:
+                # Vi tri da tim den do sau d (nuoc truoc, undo/redo, ponder): bat dau tu d+1.
+                # Luon tim it nhat mot vong kiem tra vi entry co the den tu duong di khac
+                # (lap lai, luat 50 nuoc), ke ca khi d da bang hoac vuot do sau yeu cau.
+                stored_depth, best_score, best = stored
+                self.last_completed_depth = min(stored_depth, depth)
+                self.pv_line = self._tt_pv(best, self.last_completed_depth)
+                self.root_moves.sort(key=lambda rm: rm[0] != best)
+                start_depth = min(stored_depth + 1, depth)
+                if log and self.logger is not None:
+                    self.logger.info(f"DEBUG: Tiep tuc tu Depth={stored_depth}, Move={move_uci(best)}, "
+                                     f"Score={sign * best_score}")
+
+        for current_depth in range(start_depth, depth + 1):
+            # Khong bat dau vong lap moi neu da qua gioi han mem, nuoc tot nhat da on
+            # dinh, hoac vong lap du doan (theo EBF) khong kip xong truoc gioi han cung.
+            # Doc lai self.time_manager / self.depth_limit moi vong vi ponderhit co the doi gioi han.
+            if self._check_stop() or (self.depth_limit is not None and current_depth > self.depth_limit):
+                break
+            tm = self.time_manager
+            if tm is not None and current_depth > start_depth and \
+                    not tm.should_start_iteration(self.nodes_searched):
+                break
+
+            delta = ASPIRATION_WINDOW
+            if current_depth >= ASPIRATION_MIN_DEPTH and best is not None and abs(best_score) < MATE_BOUND:
+                alpha, beta = max(best_score - delta, -INF), min(best_score + delta, INF)
+            else:
+                alpha, beta = -INF, INF
+            while True:
+                score = self._search_root(current_depth, alpha, beta)
+                if score is None:
+                    break
+                if score <= alpha:
+                    alpha = max(score - delta, -INF)
+                elif score >= beta:
+                    beta = min(score + delta, INF)
+                else:
+                    break
+                self.aspiration_researches += 1
+                delta *= 2
+                # Vong lap cat ngang van giu thu tu moi cho lan tim lai
+                self.root_moves.sort(key=lambda rm: (-rm[1], -rm[2]))
         
-        legal_moves = list(self.board.legal_moves)
-        if not legal_moves:
+            if score is None: # Bị timeout
+                # Giu nuoc tot nhat cua vong dang do neu no da duoc tim tron ven
+                if self.partial_root is not None:
+                    best, best_score = self.partial_root
+                    self.pv_line = self.pv[0] or [best]
+                    if log and self.logger is not None:
+                        self.logger.info(f"DEBUG: Ngat Depth={current_depth}, giu Move={move_uci(best)}, "
+                                         f"Score={sign * best_score}")
+                break 
+
+            # Nếu không timeout, lưu độ sâu này lại
+            self.last_completed_depth = current_depth
+            best_score = score
+            best = self.root_move
+            self.pv_line = self.pv[0] or [best]
+            if tm is not None:
+                tm.iteration_done(tm.elapsed(), best)
+            if log and self.logger is not None:
+                pv = ' '.join(move_uci(m) for m in self.pv_line)
+                self.logger.info(f"DEBUG: Hoan thanh Depth={current_depth}, Move={move_uci(best)}, "
+                                 f"Score={sign * score}, PV={pv}")
+            if self._info_callback is not None:
+                self._report_iteration(current_depth, sign * score)
+
+            # Nuoc tot nhat truoc, sau do theo diem va so node cay con
+            self.root_moves.sort(key=lambda rm: (rm[0] != best, -rm[1], -rm[2]))
+            
+            if abs(best_score) >= MATE_BOUND:
+                break
+
+        if best is None:
+            return None, None
+        return sign * best_score, best
+
+    def _multipv_deepening(self, depth, multipv, log=True):
+        """Iterative deepening Multi-PV: o moi do sau tim dong tot nhat, roi dong thu k
+        tren cac nuoc root con lai (bo cac nuoc tot nhat cua dong truoc). Cac dong dung
+        chung TT va bang sap xep nuoc. Tra ve [(move, score, depth, pv)] cua do sau
+        cuoi cung hoan thanh day du, score theo goc nhin Trang."""
+        sign = 1 if self.pos.turn == WHITE else -1
+        self.pv_line = []
+        self._init_root_moves()
+        all_moves = self.root_moves
+        multipv = min(multipv, len(all_moves))
+        lines = []
+        try:
+            for current_depth in range(1, depth + 1):
+                if self._check_stop():
+                    break
+                tm = self.time_manager
+                if tm is not None and lines and not tm.should_start_iteration(self.nodes_searched):
+                    break
+
+                new_lines = []
+                excluded = set()
+                for k in range(multipv):
+                    self.root_moves = [rm for rm in all_moves if rm[0] not in excluded]
+                    prev = sign * lines[k][1] if lines else None
+                    delta = ASPIRATION_WINDOW
+                    if current_depth >= ASPIRATION_MIN_DEPTH and prev is not None and abs(prev) < MATE_BOUND:
+                        alpha, beta = max(prev - delta, -INF), min(prev + delta, INF)
+                    else:
+                        alpha, beta = -INF, INF
+                    while True:
+                        score = self._search_root(current_depth, alpha, beta, store=(k == 0))
+                        if score is None:
+                            break
+                        if score <= alpha:
+                            alpha = max(score - delta, -INF)
+                        elif score >= beta:
+                            beta = min(score + delta, INF)
+                        else:
+                            break
+                        self.aspiration_researches += 1
+                        delta *= 2
+                        self.root_moves.sort(key=lambda rm: (-rm[1], -rm[2]))
+                    if score is None:
+                        break
+                    move = self.root_move
+                    new_lines.append((move, sign * score, current_depth, self.pv[0] or [move]))
+                    excluded.add(move)
+                self.root_moves = all_moves
+                # Moi dong la mot lan tim root rieng: do bat on dinh, dong sau co the co diem
+                # cao hon dong truoc nen xep lai theo diem cua ben di (sort on dinh)
+                new_lines.sort(key=lambda line: -sign * line[1])
+
+                if len(new_lines) < multipv:
+                    # Bi ngat: giu cac dong cua do sau truoc (cung do sau, so sanh duoc).
+                    # Chua co do sau nao xong thi dung cac dong da tim tron ven o do sau
+                    # nay (moi dong mang do sau thuc da tim; last_completed_depth van la 0)
+                    if not lines and new_lines:
+                        lines = new_lines
+                    break
+
+                lines = new_lines
+                self.last_completed_depth = current_depth
+                self.pv_line = lines[0][3]
+                if tm is not None:
+                    tm.iteration_done(tm.elapsed(), lines[0][0])
+                if log and self.logger is not None:
+                    self.logger.info(f"DEBUG: Hoan thanh Depth={current_depth}, " + ", ".join(
+                        f"{i + 1}: {move_uci(m)} ({sc})" for i, (m, sc, _, _) in enumerate(lines)))
+                if self._info_callback is not None:
+                    self._report_iteration(current_depth, lines[0][1])
+
+                # Nuoc cua cac dong theo thu tu truoc, sau do theo diem va so node cay con
+                order = {m: i for i, (m, _, _, _) in enumerate(lines)}
+                all_moves.sort(key=lambda rm: (order.get(rm[0], multipv), -rm[1], -rm[2]))
+                if all(abs(sc) >= MATE_BOUND for _, sc, _, _ in lines):
+                    break
+        finally:
+            self.root_moves = all_moves
+        if lines and not self.pv_line:
+            self.pv_line = lines[0][3]
+        return lines
+
+    def helper_search(self, board, depth, time_limit, generation, worker_id):
+        """Tim kiem cua tien trinh helper Lazy SMP: cung iterative deepening nhung
+        lech do sau theo worker_id, chay den khi co stop_flag duoc bat."""
+        self.board = board
+        # Gioi han rieng phong khi tien trinh chinh khong bao dung
+        self.time_manager = TimeManager(time_limit)
+        self.stopped = False
+        self.next_time_check = 0
+        self.tt.generation = generation
+        self.age_heuristics(board.ply())
+        self.nodes_searched = 0
+        self._sync_position()
+        offset = worker_id % 2
+        try:
+            self._iterative_deepening(depth + offset, start_depth=1 + offset, log=False)
+        finally:
+            self.time_manager = None
+        return self.nodes_searched
+
+    def _get_smp(self):
+        """Khoi tao (lan dau) nhom helper Lazy SMP; tra ve None neu chi dung 1 tien trinh."""
+        if self.smp is None and self.workers > 1:
+            try:
+                from lazy_smp import LazySMP
+                self.smp = LazySMP(self, self.workers - 1)
+            except (ImportError, OSError, ValueError) as e:
+                if self.logger is not None:
+                    self.logger.info(f"Lazy SMP khong kha dung ({e}), dung tim kiem 1 tien trinh.")
+                self.workers = 1
+                self.smp = None
+        return self.smp
+
+    def close(self):
+        """Dung ponder, cac tien trinh helper va giai phong shared memory (neu co)."""
+        self.stop_ponder()
+        if self.smp is not None:
+            self.smp.close()
+            self.smp = None
+
+    def _report_iteration(self, depth, score):
+        """Gui SearchInfo cua vong lap vua hoan thanh cho callback info."""
+        elapsed = self.time_manager.elapsed() if self.time_manager is not None else 0.0
+        self._info_callback(SearchInfo(
+            depth=depth,
+            score=score,
+            nodes=self.nodes_searched,
+            nps=int(self.nodes_searched / elapsed) if elapsed > 0 else 0,
+            hashfull=self.tt.hashfull(),
+            time=elapsed,
+            pv=[decode_move(m) for m in self.pv_line],
+        ))
+
+    def stop(self):
+        """Dung lan tim kiem dang chay (an toan khi goi tu luong khac). Tim kiem ket thuc
+        trong vong CHECK_INTERVAL node va van tra ve nuoc tot nhat da co."""
+        self._stop_event.set()
+
+    def best_move(self, depth=3, time_limit=5.0, mode='minimax_full',
+                  time_left=None, increment=0.0, moves_to_go=None, node_limit=None, cpu_limit=None): 
+        """Sử dụng thuật toán tìm kiếm tương ứng với mode và iterative deepening.
+
+        time_left / increment / moves_to_go (giay, theo dong ho cua ben di) de
+        TimeManager chia gioi han mem / cung; time_limit (neu co) chan tren ca hai.
+        node_limit / cpu_limit: ngan sach node va giay CPU (process_time) moi nuoc.
+        Giao dien cu cua search(): chi tra ve nuoc di."""
+        limits = SearchLimits(depth=depth, nodes=node_limit, movetime=time_limit, cpu_time=cpu_limit,
+                              time_left=time_left, increment=increment, moves_to_go=moves_to_go, mode=mode)
+        return self.search(limits).move
+
+    def search(self, limits=None, info=None):
+        """Tim nuoc di cho self.board theo SearchLimits, tra ve SearchResult.
+
+        info: callback nhan SearchInfo sau moi vong lap hoan thanh (minimax_full).
+        Goi stop() tu luong khac de dung som."""
+        self.stop_ponder()
+        self._stop_event.clear()
+        return self._run_search(limits or SearchLimits(), info, self.board)
+
+    # ---------------------------------------------------------
+    # PONDER: tim nuoc tra loi du doan trong luc nguoi choi suy nghi
+    # ---------------------------------------------------------
+    def start_ponder(self, board, mode='minimax_full'):
+        """Tim kiem vo han vi tri board (thuong la sau nuoc tra loi du doan) o luong nen,
+        den khi ponderhit() hoac stop_ponder(). TT, history, killer dung chung voi
+        lan tim kiem sau nen cong suy nghi khong mat ke ca khi du doan sai."""
+        self.stop_ponder()
+        self._stop_event.clear()
+        self._ponderhit_limits = None
+        self._ponder_result = None
+        self._ponder_board = board.copy()
+        self._ponder_thread = threading.Thread(
+            target=self._ponder_main, args=(SearchLimits(infinite=True, mode=mode), self._ponder_board),
+            name='ponder', daemon=True)
+        self._ponder_thread.start()
+
+    def _ponder_main(self, limits, board):
+        self._ponder_result = self._run_search(limits, None, board)
+
+    def is_pondering(self):
+        return self._ponder_thread is not None
+
+    def ponderhit(self, board, limits):
+        """Nguoi choi vua di: neu board trung vi tri dang ponder thi tim kiem nen tiep tuc
+        thanh tim kiem that voi limits (tinh tu luc nay) va tra ve SearchResult; nguoc
+        lai dung ponder (giu TT) va tra ve None."""
+        if self._ponder_thread is None:
             return None
+        # Ponder chi tim mot dong: Multi-PV phai tim lai tu dau
+        if board.fen() != self._ponder_board.fen() or limits.multipv > 1:
+            self.stop_ponder()
+            return None
+        self._ponderhit_limits = limits
+        self._ponder_thread.join()
+        self._ponder_thread = None
+        self._ponderhit_limits = None
+        return self._ponder_result
+
+    def _apply_ponderhit(self):
+        """Chay trong luong tim kiem: doi gioi han vo han sang limits cua ponderhit.
+        Ngan sach node tinh tu luc ponderhit, cac node da ponder la cho khong."""
+        limits = self._ponderhit_limits
+        self._ponderhit_limits = None
+        tm = self.time_manager
+        if tm is None:
+            return
+        if limits.depth is not None:
+            self.depth_limit = limits.depth
+            if self.last_completed_depth >= limits.depth:
+                self.stopped = True # da tim xong do sau yeu cau trong luc ponder
+        nodes = self.nodes_searched + limits.nodes if limits.nodes is not None else None
+        tm.set_limits(limits.movetime, limits.time_left, limits.increment, limits.moves_to_go,
+                      nodes, limits.cpu_time)
+
+    def stop_ponder(self):
+        """Dung tim kiem ponder (neu co) va cho luong ket thuc; TT va heuristic duoc giu."""
+        if self._ponder_thread is None:
+            return
+        self._stop_event.set()
+        self._ponder_thread.join()
+        self._ponder_thread = None
+        self._ponderhit_limits = None
+
+    def _run_search(self, limits, info, board):
+        mode = limits.mode
+        depth = limits.depth or MAX_SEARCH_DEPTH
+        self.last_score = None
+        legal_moves = list(board.legal_moves)
+        if not legal_moves:
+            return SearchResult(move=None, score=None, depth=0, nodes=0, time=0.0, pv=[], stopped=False,
+                                lines=[])
         
-        start_time = time.time() 
-        self.stop_time = start_time + time_limit
+        if limits.infinite:
+            tm = self.time_manager = TimeManager()
+        else:
+            tm = self.time_manager = TimeManager(limits.movetime, limits.time_left, limits.increment,
+                                                 limits.moves_to_go, limits.nodes, limits.cpu_time)
+        self.stopped = False
+        self.next_time_check = 0
+        self.partial_root = None
+        self.depth_limit = depth
+        self._info_callback = info
         last_safe_move = random.choice(legal_moves) 
         
         # --- RESET TOÀN BỘ SỐ LIỆU ---
-        self.killers.clear()
-        self.history.clear()
+        self.age_heuristics(board.ply())
         self.nodes_searched = 0
         self.tt_hits = 0
+        self.cutoffs = self.cutoff_moves = self.first_move_cutoffs = 0
+        self.aspiration_researches = 0
+        self.null_cutoffs = self.lmr_reductions = self.lmr_researches = self.lmp_pruned = 0
+        self.qnodes = self.delta_pruned = self.see_pruned = 0
+        self.last_pv = []
         self.last_completed_depth = 0
+        self.tt.new_search()
+        self.tt.reset_stats()
+        self.pawn_table.reset_stats()
+        self.eval_cache.reset_stats()
         # ------------------------------
         
-        is_maximizing_player = self.board.turn == chess.WHITE
+        self._sync_position(board)
+        is_maximizing_player = board.turn == chess.WHITE
+        pv_lines = []
         
-        if mode == 'minimax_pure':
-        # CẤP ĐỘ DỄ:
-            score, mv = self.minimax_pure(depth, is_maximizing_player)
-            if mv is not None:
-                self.last_completed_depth = depth
-                last_safe_move = mv
-            # (Chúng ta sẽ in số liệu ở cuối)
-
-        else: 
-        # CẤP ĐỘ TRUNG BÌNH/KHÓ:
-            best_score_so_far = float('-inf') if is_maximizing_player else float('inf')
-            
-            try:
-                for current_depth in range(1, depth + 1):
-                    if time.time() >= self.stop_time:
-                        break
-            
-                    score, mv = self.minimax_full(current_depth, float('-inf'), float('inf'), is_maximizing_player)
-                
-                    if score is None: # Bị timeout
-                        break 
-
-                    # Nếu không timeout, lưu độ sâu này lại
-                    self.last_completed_depth = current_depth
-                    print(f"DEBUG: Hoan thanh Depth={current_depth}, Move={mv.uci() if mv else 'None'}, Score={score}")
+        try:
+            if mode == 'minimax_pure':
+            # CẤP ĐỘ DỄ:
+                score, mv = self.minimax_pure(depth, is_maximizing_player)
+                if mv is not None:
+                    self.last_completed_depth = depth
+                elif self.partial_root is not None:
+                    mv, score = self.partial_root # bi ngat: nuoc tot nhat trong cac nuoc da tim xong
+                if mv is not None:
+                    self.last_score = score
+                    last_safe_move = decode_move(mv)
+                    self.last_pv = [last_safe_move]
+                # (Chúng ta sẽ in số liệu ở cuối)
 
+            else: 
+            # CẤP ĐỘ TRUNG BÌNH/KHÓ:
+                smp = self._get_smp()
+                helper_nodes = 0
+                try:
+                    if smp is not None:
+                        smp.start_search(board, depth, tm.hard if tm.hard is not None else 1e9,
+                                         self.tt.generation)
+                    if limits.multipv > 1:
+                        pv_lines = [PVLine(decode_move(m), sc, d, [decode_move(x) for x in pv])
+                                    for m, sc, d, pv in self._multipv_deepening(depth, limits.multipv)]
+                        score, mv = (pv_lines[0].score, pv_lines[0].move) if pv_lines else (None, None)
+                    else:
+                        score, mv = self._iterative_deepening(depth, log=True, resume=True)
+                        mv = decode_move(mv) if mv is not None else None
                     if mv is not None:
-                        if (is_maximizing_player and score >= best_score_so_far) or \
-                            (not is_maximizing_player and score <= best_score_so_far):
-                            best_score_so_far = score
-                            last_safe_move = mv 
-                    
-                    if abs(best_score_so_far) >= 99999:
-                        break
-            
-            finally:
-                self.stop_time = None 
+                        self.last_score = score
+                        last_safe_move = mv
+                        self.last_pv = [decode_move(m) for m in self.pv_line]
+                finally:
+                    if smp is not None:
+                        helper_nodes = smp.stop_search()
+                self.nodes_searched += helper_nodes
+        finally:
+            self._info_callback = None
+            self.time_manager = None
+            self.depth_limit = None
         
-        # --- IN BẢNG SỐ LIỆU CUỐI CÙNG ---
-        total_time = time.time() - start_time
+        total_time = tm.elapsed()
+        self.tt_hits = self.tt.hits
+        if not pv_lines and self.last_pv:
+            pv_lines = [PVLine(last_safe_move, self.last_score, self.last_completed_depth, list(self.last_pv))]
+        result = SearchResult(move=last_safe_move, score=self.last_score, depth=self.last_completed_depth,
+                              nodes=self.nodes_searched, time=total_time, pv=list(self.last_pv),
+                              stopped=self.stopped, lines=pv_lines)
+        if self.logger is not None:
+            self._log_stats(mode, tm, result)
+        return result
+
+    def _log_stats(self, mode, tm, result):
+        """Ghi bang so lieu cua lan tim kiem vua xong ra logger."""
+        total_time = result.time
         nps = int(self.nodes_searched / total_time) if total_time > 0 else 0
-        
-        print("\n--- KET QUA TEST ---")
-        print(f"Mode Duoc Chon: {mode}")
-        print(f"Thoi gian chay: {total_time:.2f}s (Gioi han: {time_limit}s)")
-        print(f"Depth Dat Duoc: {self.last_completed_depth}")
-        print(f"Tong The Co (Nodes): {self.nodes_searched}")
-        print(f"The Co / giay (NPS): {nps}")
-        print(f"Tra 'Bo Nho' (TT Hits): {self.tt_hits}")
-        print(f"Nuoc Di Duoc Chon: {last_safe_move.uci() if last_safe_move else 'None'}")
-        print("--------------------\n")
-        # ---------------------------------
-        
-        return last_safe_move
\ No newline at end of file
+        tt_stats = self.tt.stats()
+        limits = ' / '.join('-' if t is None else f"{t:.2f}s" for t in (tm.soft, tm.hard))
+        lines = [
+            "\n--- KET QUA TEST ---",
+            f"Mode Duoc Chon: {mode}",
+            f"Thoi gian chay: {total_time:.2f}s (Gioi han mem / cung: {limits}) | CPU: {tm.cpu_elapsed():.2f}s",
+            f"Depth Dat Duoc: {self.last_completed_depth}",
+            f"Tong The Co (Nodes): {self.nodes_searched} (QNodes: {self.qnodes})",
+        ]
+        if self.smp is not None:
+            lines.append(f"Lazy SMP: {self.workers} tien trinh")
+        lines += [
+            f"The Co / giay (NPS): {nps}",
+            f"Tra 'Bo Nho' (TT Hits): {self.tt_hits} / {tt_stats['probes']} probes",
+            f"TT Collisions: {tt_stats['collisions']} | Hashfull: {tt_stats['hashfull']}/1000",
+            f"Pawn hash: {self.pawn_table.hits} / {self.pawn_table.probes} "
+            f"({100 * self.pawn_table.hit_rate():.1f}%)",
+            f"Eval cache: {self.eval_cache.hits} / {self.eval_cache.probes} "
+            f"({100 * self.eval_cache.hit_rate():.1f}%) | tiet kiem ~{self.eval_cache.time_saved():.2f}s",
+        ]
+        if self.cutoffs:
+            lines.append(f"Cat tia (Cutoffs): {self.cutoffs} | TB so nuoc truoc khi cat: "
+                         f"{self.cutoff_moves / self.cutoffs:.2f} | Cat o nuoc dau: "
+                         f"{100 * self.first_move_cutoffs / self.cutoffs:.1f}%")
+        if self.aspiration_researches:
+            lines.append(f"Aspiration tim lai: {self.aspiration_researches}")
+        lines += [
+            f"QSearch bo qua: delta {self.delta_pruned} | SEE {self.see_pruned}",
+            f"Null move cat: {self.null_cutoffs} | LMR: {self.lmr_reductions} "
+            f"(tim lai {self.lmr_researches}) | LMP bo qua: {self.lmp_pruned}",
+            f"Nuoc Di Duoc Chon: {result.move.uci() if result.move else 'None'}",
+            f"PV: {' '.join(m.uci() for m in result.pv)}",
+        ]
+        if len(result.lines) > 1:
+            lines += [f"  {i + 1}. {line.score} d={line.depth}: {' '.join(m.uci() for m in line.pv)}"
+                      for i, line in enumerate(result.lines)]
+        lines.append("--------------------\n")
+        self.logger.info("\n".join(lines))
@@ -2,7 +2,8 @@ import pygame
 import os
 import sys
 import chess
-from chess_engine import ChessEngine 
+from chess_engine import ChessEngine, DIFFICULTY_LEVELS
+from search_api import SearchLimits
 
 # Kích thước cố định cho BÀN CỜ
 WIDTH, HEIGHT = 640, 640
@@ -54,15 +55,8 @@ class ChessGUI:
         self.screen = pygame.display.set_mode((TOTAL_WIDTH, TOTAL_HEIGHT)) 
         pygame.display.set_caption("Game Cờ Vua - Python Form Team 2")
         
-        # Cấu hình mức độ khó (SỬ DỤNG CHẾ ĐỘ MINIMAX MỚI)
-        self.difficulty_levels = {
-            # MODE 'minimax_pure': Minimax cơ bản (chậm và yếu)
-            "Easy": {'depth': 2, 'time': 0.5, 'mode': 'minimax_pure'}, 
-            # MODE 'minimax_full': Minimax + Alpha-Beta (tốt)
-            "Medium": {'depth': 3, 'time': 1.0, 'mode': 'minimax_full'}, 
-            # MODE 'minimax_full': Minimax + Alpha-Beta + Nâng cao (rất tốt)
-            "Difficult": {'depth': 5, 'time': 5.0, 'mode': 'minimax_full'} 
-        }
+        # Cấu hình mức độ khó (ngân sách node mỗi nước, xem DIFFICULTY_LEVELS)
+        self.difficulty_levels = dict(DIFFICULTY_LEVELS)
         self.current_difficulty = "Medium" 
         
         self.running = True
@@ -113,21 +107,20 @@ class ChessGUI:
     
     def new_game(self):
         """Đặt lại trò chơi về trạng thái ban đầu."""
+        self.engine.new_game() # TT/history chi bi lam cu, khong xoa
         self.engine.board = chess.Board()
         self.selected_square = None
         self.legal_moves = []
         self.promotion_pending = None
         self.promotion_rects = []
         self.move_scroll_y = 0
-        self.engine.tt.table.clear() 
-        self.engine.killers.clear() 
-        self.engine.history.clear() 
         self.undone_moves = []
         self.is_draw_offered = False
         print("--- Đã bắt đầu ván cờ mới ---")
         
     def undo_move(self):
         """Lùi lại 2 nước đi (người chơi và AI) nếu có thể."""
+        self.engine.stop_ponder() # Vị trí đang ponder không còn đúng
         if len(self.engine.board.move_stack) >= 2:
             # Lùi nước đi của AI (đen)
             ai_move = self.engine.board.pop()
@@ -152,6 +145,7 @@ class ChessGUI:
 
     def redo_move(self):
         """Tiếp 2 nước đi (người chơi và AI) nếu có thể."""
+        self.engine.stop_ponder()
         if len(self.undone_moves) >= 2:
             # Tiếp nước đi của Người chơi (trắng)
             player_move = self.undone_moves.pop()
@@ -177,12 +171,14 @@ class ChessGUI:
     def offer_draw(self):
         """Đề nghị hòa."""
         self.is_draw_offered = True
+        self.engine.stop_ponder()
         print("Người chơi đề nghị Hòa.")
 
     def exit_game(self):
         """Thoát trò chơi."""
         self.running = False
         print("Đã thoát game.")
+        self.engine.close()
         pygame.quit()
         sys.exit()
 
@@ -584,6 +580,18 @@ class ChessGUI:
         self.screen.blit(text_surface, text_rect)
 
             
+    def start_ponder(self, config, pv):
+        """Trong lúc người chơi suy nghĩ, AI tìm trước vị trí sau nước trả lời dự đoán (pv[1])."""
+        board = self.engine.board
+        if config['mode'] != 'minimax_full' or len(pv) < 2 or board.is_game_over():
+            return
+        if pv[1] not in board.legal_moves:
+            return
+        ponder_board = board.copy()
+        ponder_board.push(pv[1])
+        if not ponder_board.is_game_over():
+            self.engine.start_ponder(ponder_board)
+
     def run(self):
         """Vòng lặp chính"""
         clock = pygame.time.Clock()
@@ -606,15 +614,23 @@ class ChessGUI:
                 
                 config = self.difficulty_levels[self.current_difficulty]
                 
-                # SỬ DỤNG THAM SỐ MODE MỚI
-                move = self.engine.best_move(
-                    depth=config['depth'], 
-                    time_limit=config['time'],
-                    mode=config['mode'] 
-                ) 
+                limits = SearchLimits(depth=config['depth'], nodes=config['nodes'],
+                                      movetime=config['time'], mode=config['mode'])
+                
+                # Người chơi đi đúng nước đã đoán: tìm kiếm ponder chạy tiếp thành tìm kiếm thật
+                result = None
+                if config['mode'] == 'minimax_full':
+                    result = self.engine.ponderhit(self.engine.board, limits)
+                if result is None:
+                    result = self.engine.search(limits)
+                move = result.move
                 if move:
                     self.engine.board.push(move)
                     self.undone_moves = [] # Xóa lịch sử Redo sau khi AI đi
+                    self.start_ponder(config, result.pv)
+            elif self.engine.is_pondering() and (self.engine.board.is_game_over() or self.is_draw_offered):
+                # Nước của người chơi kết thúc ván / đề nghị hòa: AI không đi tiếp, dừng ponder
+                self.engine.stop_ponder()
             
             self.draw_board()
             self.draw_pieces()
@@ -625,4 +641,5 @@ class ChessGUI:
             pygame.display.flip()
             clock.tick(30)
         
+        self.engine.close()
         pygame.quit()
\ No newline at end of file
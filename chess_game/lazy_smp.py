@@ -0,0 +1,96 @@
+import multiprocessing as mp
+import queue
+import random
+from multiprocessing import shared_memory
+
+from chess_engine import ChessEngine, TranspositionTable
+
+
+def _helper_main(worker_id, shm, size_mb, jobs, results, stop_flag):
+    """Vong lap cua tien trinh helper: nhan vi tri, tim kiem den khi bi bao dung."""
+    random.seed(worker_id * 7919)
+    engine = ChessEngine(tt_size_mb=0, verbose=False)
+    engine.tt = TranspositionTable(size_mb, buffer=shm.buf)
+    engine.stop_flag = stop_flag
+    # Moi helper co muc nhieu khac nhau de duyet cay theo thu tu khac tien trinh chinh
+    engine.order_noise = 16 * worker_id
+    try:
+        while True:
+            job = jobs.get()
+            if job is None:
+                break
+            search_id, board, depth, time_limit, generation = job
+            nodes = engine.helper_search(board, depth, time_limit, generation, worker_id)
+            results.put((search_id, nodes))
+    finally:
+        engine.tt.release()
+
+
+class LazySMP:
+    """Lazy SMP: cac tien trinh helper chay cung iterative deepening voi tien trinh
+    chinh va chia se mot TT dat trong multiprocessing.shared_memory (khong khoa,
+    entry loi duoc loai bo nho khoa XOR). Ket qua cua tien trinh chinh duoc dung."""
+
+    def __init__(self, engine, helpers):
+        self.engine = engine
+        self.size_mb = engine.tt.size_mb
+        self.shm = shared_memory.SharedMemory(create=True, size=TranspositionTable.nbytes(self.size_mb))
+        self.stop_flag = mp.RawValue('b', 0)
+        self.results = mp.Queue()
+        self.jobs = []
+        self.processes = []
+        self.search_id = 0
+        try:
+            for worker_id in range(1, helpers + 1):
+                jobs = mp.Queue()
+                p = mp.Process(
+                    target=_helper_main,
+                    args=(worker_id, self.shm, self.size_mb, jobs, self.results, self.stop_flag),
+                    daemon=True,
+                )
+                p.start()
+                self.jobs.append(jobs)
+                self.processes.append(p)
+        except Exception:
+            self.close()
+            raise
+        # Tien trinh chinh dung chung bang voi cac helper
+        engine.tt = TranspositionTable(self.size_mb, buffer=self.shm.buf)
+
+    def start_search(self, board, depth, time_limit, generation):
+        """Gui vi tri hien tai cho tat ca helper."""
+        self.search_id += 1
+        self.stop_flag.value = 0
+        for jobs in self.jobs:
+            jobs.put((self.search_id, board.copy(), depth, time_limit, generation))
+
+    def stop_search(self, timeout=2.0):
+        """Bao cac helper dung va tra ve tong so node helper da duyet."""
+        self.stop_flag.value = 1
+        nodes = 0
+        pending = len(self.jobs)
+        while pending:
+            try:
+                search_id, n = self.results.get(timeout=timeout)
+            except queue.Empty:
+                break
+            if search_id == self.search_id:
+                nodes += n
+                pending -= 1
+        return nodes
+
+    def close(self):
+        self.stop_flag.value = 1
+        for jobs in self.jobs:
+            jobs.put(None)
+        for p in self.processes:
+            p.join(timeout=2.0)
+            if p.is_alive():
+                p.terminate()
+        self.jobs = []
+        self.processes = []
+        if self.engine.tt._raw is not None:
+            self.engine.tt.release()
+            self.engine.tt = TranspositionTable(self.size_mb)
+        self.shm.close()
+        self.shm.unlink()
@@ -0,0 +1,97 @@
+import random
+
+# Cac giai doan cua MovePicker (theo thu tu duyet)
+STAGE_TT, STAGE_GOOD_CAPTURES, STAGE_KILLERS, STAGE_QUIETS, STAGE_BAD_CAPTURES, STAGE_DONE = range(6)
+
+
+class MovePicker:
+    """Chon nuoc di theo tung giai doan, chi sinh va cham diem nuoc khi den giai doan do:
+    nuoc TT -> an quan tot (MVV-LVA, SEE >= 0) -> killer, counter-move -> nuoc yen
+    tinh theo history -> an quan xau. Phan lon node bi cat ngay o nuoc TT hoac o mot
+    nuoc an quan, khi do cac nuoc yen tinh khong bao gio duoc sinh ra.
+
+    Nuoc tra ve la nuoc gia hop le, moi nuoc chi xuat hien mot lan; tinh hop le van do
+    vong lap tim kiem kiem tra. quiescence=True chi tra ve an quan va phong cap."""
+
+    def __init__(self, engine, tt_move=None, ply=0, quiescence=False):
+        self.engine = engine
+        self.pos = engine.pos
+        self.tt_move = tt_move or 0
+        self.ply = ply
+        self.quiescence = quiescence
+        self.stage = STAGE_TT
+
+    def _capture_score(self, move):
+        score = self.engine._mvv_lva_value(move)
+        if move >> 12: # phong cap
+            score += 8000
+        return score
+
+    def _is_bad_capture(self, move):
+        """An quan thua vat chat theo SEE (phong cap khong bao gio bi coi la xau)."""
+        return not move >> 12 and not self.engine.see_ge(move, 0)
+
+    def __iter__(self):
+        pos = self.pos
+        engine = self.engine
+        tt_move = self.tt_move
+
+        # 1. Nuoc TT: duyet truoc khi sinh bat ky nuoc nao
+        self.stage = STAGE_TT
+        if tt_move and pos.is_pseudo_legal(tt_move) and \
+                (not self.quiescence or tt_move >> 12 or pos.is_capture(tt_move)):
+            yield tt_move
+
+        # 2. An quan: chon dan nuoc co diem MVV-LVA cao nhat (selection sort luoi),
+        #    an quan xau de danh den cuoi
+        self.stage = STAGE_GOOD_CAPTURES
+        captures = pos.generate_captures()
+        scores = [self._capture_score(m) for m in captures]
+        bad_captures = []
+        while captures:
+            best = 0
+            for i in range(1, len(scores)):
+                if scores[i] > scores[best]:
+                    best = i
+            move = captures[best]
+            captures[best] = captures[-1]
+            scores[best] = scores[-1]
+            captures.pop()
+            scores.pop()
+            if move == tt_move:
+                continue
+            if not self.quiescence and self._is_bad_capture(move):
+                bad_captures.append(move)
+                continue
+            yield move
+
+        if self.quiescence:
+            self.stage = STAGE_DONE
+            return
+
+        # 3. Killer va counter-move (chi nuoc yen tinh con gia hop le o vi tri nay)
+        self.stage = STAGE_KILLERS
+        k1, k2 = engine.killer_moves(self.ply)
+        tried = [tt_move]
+        for move in (k1, k2, engine.counter_move()):
+            if move and move not in tried and not move >> 12 and \
+                    not pos.is_capture(move) and pos.is_pseudo_legal(move):
+                tried.append(move)
+                yield move
+
+        # 4. Nuoc yen tinh, sap theo butterfly + continuation history
+        self.stage = STAGE_QUIETS
+        quiet_score = engine.quiet_score
+        offsets = engine.continuation_offsets()
+        noise = engine.order_noise
+        quiets = [m for m in pos.generate_quiets() if m not in tried]
+        if noise:
+            quiets.sort(key=lambda m: -(quiet_score(m, offsets) + random.randrange(noise)))
+        else:
+            quiets.sort(key=lambda m: -quiet_score(m, offsets))
+        yield from quiets
+
+        # 5. An quan xau
+        self.stage = STAGE_BAD_CAPTURES
+        yield from bad_captures
+        self.stage = STAGE_DONE
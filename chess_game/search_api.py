@@ -0,0 +1,64 @@
+import collections
+import logging
+import sys
+
+# Do sau toi da khi SearchLimits khong dat depth (tim den khi het gioi han khac / stop())
+MAX_SEARCH_DEPTH = 64
+
+
+class SearchLimits:
+    """Gioi han cho mot lan tim kiem (ChessEngine.search).
+
+    depth: do sau toi da (None = MAX_SEARCH_DEPTH); nodes: ngan sach node;
+    movetime: giay moi nuoc (thoi gian thuc); cpu_time: giay CPU moi nuoc;
+    time_left / increment / moves_to_go: dong ho van dau cua ben di, de TimeManager
+    tu chia thoi gian; infinite: bo qua moi gioi han, chi dung khi goi stop().
+    mode: 'minimax_full' (negamax + iterative deepening) hoac 'minimax_pure'.
+    multipv: so dong (nuoc tot nhat khac nhau o root) can tra ve, chi voi minimax_full."""
+
+    def __init__(self, depth=None, nodes=None, movetime=None, cpu_time=None,
+                 time_left=None, increment=0.0, moves_to_go=None, infinite=False,
+                 mode='minimax_full', multipv=1):
+        self.depth = depth
+        self.nodes = nodes
+        self.movetime = movetime
+        self.cpu_time = cpu_time
+        self.time_left = time_left
+        self.increment = increment
+        self.moves_to_go = moves_to_go
+        self.infinite = infinite
+        self.mode = mode
+        self.multipv = multipv
+
+    def __repr__(self):
+        fields = ', '.join(f"{k}={v!r}" for k, v in vars(self).items()
+                           if v not in (None, False, 0.0) and not (k == 'multipv' and v == 1))
+        return f"SearchLimits({fields})"
+
+
+# Thong tin sau moi vong lap hoan thanh (gui cho callback info). score theo goc nhin
+# Trang, time tinh bang giay, pv la danh sach chess.Move.
+SearchInfo = collections.namedtuple(
+    'SearchInfo', ['depth', 'score', 'nodes', 'nps', 'hashfull', 'time', 'pv'])
+
+# Mot dong Multi-PV: nuoc o root, diem (goc nhin Trang), do sau hoan thanh va PV.
+PVLine = collections.namedtuple('PVLine', ['move', 'score', 'depth', 'pv'])
+
+# Ket qua cua ChessEngine.search. move la None chi khi khong co nuoc hop le;
+# stopped = True neu tim kiem bi ngat (gioi han cung, ngan sach, stop()).
+# lines: cac PVLine tot nhat truoc (toi da SearchLimits.multipv dong; dong dau
+# trung voi move / score / pv).
+SearchResult = collections.namedtuple(
+    'SearchResult', ['move', 'score', 'depth', 'nodes', 'time', 'pv', 'stopped', 'lines'])
+
+
+def console_logger():
+    """Logger mac dinh khi verbose=True: in thong diep ra stdout nhu truoc day."""
+    logger = logging.getLogger('chess_engine')
+    if not logger.handlers:
+        handler = logging.StreamHandler(sys.stdout)
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+    return logger
@@ -0,0 +1,875 @@
+import chess
+import chess.polyglot
+
+# Ma quan trong mailbox: piece_type + 8 * color (Trang = 1, Den = 0), 0 = o trong
+PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING = range(1, 7)
+WHITE, BLACK = 1, 0
+
+# Bit quyen nhap thanh
+WK, WQ, BK, BQ = 1, 2, 4, 8
+
+BB_ALL = chess.BB_ALL
+BB_FILE_A = chess.BB_FILE_A
+BB_FILE_H = chess.BB_FILE_H
+BB_RANK_3 = chess.BB_RANK_3
+BB_RANK_6 = chess.BB_RANK_6
+BB_BACKRANKS = chess.BB_RANK_1 | chess.BB_RANK_8
+
+KNIGHT_ATTACKS = chess.BB_KNIGHT_ATTACKS
+KING_ATTACKS = chess.BB_KING_ATTACKS
+PAWN_ATTACKS = chess.BB_PAWN_ATTACKS    # [color][square]
+_DIAG_MASKS = chess.BB_DIAG_MASKS
+_DIAG_ATTACKS = chess.BB_DIAG_ATTACKS
+_FILE_MASKS = chess.BB_FILE_MASKS
+_FILE_ATTACKS = chess.BB_FILE_ATTACKS
+_RANK_MASKS = chess.BB_RANK_MASKS
+_RANK_ATTACKS = chess.BB_RANK_ATTACKS
+BB_RAYS = chess.BB_RAYS                  # [a][b]: ca duong thang qua a va b (0 neu khong thang hang)
+BB_BETWEEN = [[chess.between(a, b) for b in range(64)] for a in range(64)]
+
+PROMOTIONS = (QUEEN, KNIGHT, ROOK, BISHOP)
+
+# Gia tri quan mac dinh cho SEE, theo loai quan (chi so 0 = o trong)
+SEE_VALUES = (0, 100, 320, 330, 500, 900, 20000)
+
+# Quyen nhap thanh con lai sau khi mot nuoc di cham vao o nay (from hoac to)
+CASTLE_MASK = [15] * 64
+CASTLE_MASK[chess.A1] = 15 & ~WQ
+CASTLE_MASK[chess.E1] = 15 & ~(WK | WQ)
+CASTLE_MASK[chess.H1] = 15 & ~WK
+CASTLE_MASK[chess.A8] = 15 & ~BQ
+CASTLE_MASK[chess.E8] = 15 & ~(BK | BQ)
+CASTLE_MASK[chess.H8] = 15 & ~BK
+
+# Bang Zobrist lay tu Polyglot de khoa trung voi chess.polyglot.zobrist_hash
+_RND = chess.polyglot.POLYGLOT_RANDOM_ARRAY
+Z_PIECE = [[0] * 64 for _ in range(16)]
+for _pt in range(PAWN, KING + 1):
+    for _color in (BLACK, WHITE):
+        _index = (_pt - 1) * 2 + _color
+        Z_PIECE[_pt + 8 * _color] = [_RND[64 * _index + _sq] for _sq in range(64)]
+Z_CASTLE = [0] * 16
+for _rights in range(16):
+    for _bit, _offset in ((WK, 768), (WQ, 769), (BK, 770), (BQ, 771)):
+        if _rights & _bit:
+            Z_CASTLE[_rights] ^= _RND[_offset]
+Z_EP = [_RND[772 + _f] for _f in range(8)]
+Z_SIDE = _RND[780]
+
+# Bang danh gia rong (mac dinh khi engine chua gan bang PST): [ma quan * 64 + o], [ma quan]
+_ZERO_PSQ = [0] * (16 * 64)
+_ZERO_PHASE = [0] * 16
+
+
+def bishop_attacks(sq, occupied):
+    return _DIAG_ATTACKS[sq][_DIAG_MASKS[sq] & occupied]
+
+
+def rook_attacks(sq, occupied):
+    return _RANK_ATTACKS[sq][_RANK_MASKS[sq] & occupied] | _FILE_ATTACKS[sq][_FILE_MASKS[sq] & occupied]
+
+
+def encode_move(move):
+    """Ma hoa chess.Move thanh so nguyen 16 bit: from | to << 6 | promotion << 12."""
+    if move is None:
+        return 0
+    return move.from_square | (move.to_square << 6) | ((move.promotion or 0) << 12)
+
+
+def decode_move(code):
+    """Giai ma so nguyen 16 bit thanh chess.Move (0 -> None)."""
+    if not code:
+        return None
+    return chess.Move(code & 63, (code >> 6) & 63, (code >> 12) or None)
+
+
+def move_uci(code):
+    return decode_move(code).uci() if code else '0000'
+
+
+class SearchPosition:
+    """Vi tri gon nhe cho vong lap tim kiem: bitboard theo ma quan + mailbox 64 o.
+    push/pop dung ban ghi undo nho (tuple) thay cho stack trang thai cua chess.Board,
+    nuoc di la so nguyen (xem encode_move). Khoa Zobrist Polyglot duoc cap nhat
+    tang dan bang XOR. Chi chuyen doi voi chess.Board o root (from_board/to_board).
+
+    ep chi duoc dat khi ben di co tot san sang an qua duong (giong quy uoc Polyglot),
+    nen khoa en passant = Z_EP[file] moi khi ep khac None."""
+
+    def __init__(self):
+        self.board = [0] * 64          # mailbox: ma quan moi o
+        self.bb = [0] * 16             # bitboard theo ma quan
+        self.occ = [0, 0]              # [Den, Trang]
+        self.occupied = 0
+        self.turn = WHITE
+        self.castling = 0
+        self.ep = None
+        self.halfmove = 0
+        self.fullmove = 1
+        self.key = 0
+        self.pawn_key = 0              # khoa Zobrist chi gom cac quan tot (cho bang bam cau truc tot)
+        self.stack = []                # ban ghi undo
+        self.keys = []                 # khoa cua cac vi tri truoc (lich su van + duong tim kiem)
+        self.debug = False             # assert khoa tang dan == khoa tinh lai sau moi push/pop
+        # Tong tang dan cho danh gia: vat chat + PST trung cuoc / tan cuoc (goc nhin Trang)
+        # va giai doan van co, cap nhat boi push/pop theo bang phang cua engine
+        self.psq_mg_table = _ZERO_PSQ
+        self.psq_eg_table = _ZERO_PSQ
+        self.phase_table = _ZERO_PHASE
+        self.mg = 0
+        self.eg = 0
+        self.phase = 0
+
+    # ------------------------------------------------------------------
+    # Chuyen doi voi chess.Board
+    # ------------------------------------------------------------------
+    @classmethod
+    def from_board(cls, board):
+        """Dung vi tri tu chess.Board, phat lai move_stack de co lich su khoa."""
+        pos = cls()
+        pos._load(board.root())
+        for move in board.move_stack:
+            pos.push(encode_move(move))
+        pos.stack = []
+        return pos
+
+    def _load(self, board):
+        for sq, piece in board.piece_map().items():
+            code = piece.piece_type + 8 * int(piece.color)
+            self.board[sq] = code
+            self.bb[code] |= 1 << sq
+            self.occ[int(piece.color)] |= 1 << sq
+        self.occupied = self.occ[0] | self.occ[1]
+        self.turn = WHITE if board.turn else BLACK
+        rights = board.clean_castling_rights()
+        self.castling = ((WK if rights & chess.BB_H1 else 0) | (WQ if rights & chess.BB_A1 else 0) |
+                         (BK if rights & chess.BB_H8 else 0) | (BQ if rights & chess.BB_A8 else 0))
+        ep = board.ep_square
+        if ep is not None and PAWN_ATTACKS[self.turn ^ 1][ep] & self.bb[PAWN + 8 * self.turn]:
+            self.ep = ep
+        self.halfmove = board.halfmove_clock
+        self.fullmove = board.fullmove_number
+        self.key = self.compute_key()
+        self.pawn_key = self.compute_pawn_key()
+        self.keys = []
+
+    def fen(self):
+        rows = []
+        for rank in range(7, -1, -1):
+            row, empty = '', 0
+            for f in range(8):
+                code = self.board[rank * 8 + f]
+                if not code:
+                    empty += 1
+                    continue
+                if empty:
+                    row += str(empty)
+                    empty = 0
+                symbol = chess.PIECE_SYMBOLS[code & 7]
+                row += symbol.upper() if code >> 3 else symbol
+            if empty:
+                row += str(empty)
+            rows.append(row)
+        castling = ''.join(c for bit, c in ((WK, 'K'), (WQ, 'Q'), (BK, 'k'), (BQ, 'q')) if self.castling & bit) or '-'
+        ep = chess.SQUARE_NAMES[self.ep] if self.ep is not None else '-'
+        return f"{'/'.join(rows)} {'w' if self.turn else 'b'} {castling} {ep} {self.halfmove} {self.fullmove}"
+
+    def to_board(self):
+        return chess.Board(self.fen())
+
+    def set_eval_tables(self, mg, eg, phase):
+        """Gan bang phang [ma quan * 64 + o] (vat chat + PST, Den mang dau am) va trong
+        so giai doan [ma quan], roi tinh lai cac tong tang dan."""
+        self.psq_mg_table = mg
+        self.psq_eg_table = eg
+        self.phase_table = phase
+        self.mg, self.eg, self.phase = self.compute_accumulators()
+
+    def compute_accumulators(self):
+        """Tinh (mg, eg, phase) bang cach quet ca ban co (dung de kiem tra)."""
+        mg = eg = phase = 0
+        for sq in range(64):
+            code = self.board[sq]
+            if code:
+                mg += self.psq_mg_table[code * 64 + sq]
+                eg += self.psq_eg_table[code * 64 + sq]
+                phase += self.phase_table[code]
+        return mg, eg, phase
+
+    def compute_key(self):
+        """Tinh khoa Zobrist tu dau (dung de kiem tra khoa tang dan)."""
+        h = 0
+        for sq in range(64):
+            code = self.board[sq]
+            if code:
+                h ^= Z_PIECE[code][sq]
+        h ^= Z_CASTLE[self.castling]
+        if self.ep is not None:
+            h ^= Z_EP[self.ep & 7]
+        if self.turn == WHITE:
+            h ^= Z_SIDE
+        return h
+
+    def compute_pawn_key(self):
+        """Tinh khoa Zobrist chi cua cac quan tot tu dau."""
+        h = 0
+        for code in (PAWN, PAWN + 8):
+            for sq in chess.scan_forward(self.bb[code]):
+                h ^= Z_PIECE[code][sq]
+        return h
+
+    # ------------------------------------------------------------------
+    # Make / unmake
+    # ------------------------------------------------------------------
+    def push(self, move):
+        fr = move & 63
+        to = (move >> 6) & 63
+        promo = move >> 12
+        board = self.board
+        bb = self.bb
+        occ = self.occ
+        us = self.turn
+        them = us ^ 1
+        piece = board[fr]
+        captured = board[to]
+        old_ep = self.ep
+
+        self.stack.append((move, piece, captured, self.castling, old_ep, self.halfmove, self.key,
+                           self.mg, self.eg, self.phase, self.pawn_key))
+        self.keys.append(self.key)
+        mg_t = self.psq_mg_table
+        eg_t = self.psq_eg_table
+        ph_t = self.phase_table
+
+        key = self.key ^ Z_SIDE ^ Z_CASTLE[self.castling]
+        if old_ep is not None:
+            key ^= Z_EP[old_ep & 7]
+        self.ep = None
+        self.halfmove += 1
+
+        from_bb = 1 << fr
+        to_bb = 1 << to
+        board[fr] = 0
+        bb[piece] ^= from_bb
+        occ[us] ^= from_bb
+        key ^= Z_PIECE[piece][fr]
+        mg = self.mg - mg_t[piece * 64 + fr]
+        eg = self.eg - eg_t[piece * 64 + fr]
+        phase = self.phase
+        pawn_key = self.pawn_key
+
+        if captured:
+            bb[captured] ^= to_bb
+            occ[them] ^= to_bb
+            key ^= Z_PIECE[captured][to]
+            self.halfmove = 0
+            mg -= mg_t[captured * 64 + to]
+            eg -= eg_t[captured * 64 + to]
+            phase -= ph_t[captured]
+            if captured & 7 == PAWN:
+                pawn_key ^= Z_PIECE[captured][to]
+
+        placed = piece
+        pt = piece & 7
+        if pt == PAWN:
+            self.halfmove = 0
+            pawn_key ^= Z_PIECE[piece][fr]
+            if to == old_ep:
+                cap_sq = to - 8 if us else to + 8
+                cap_code = PAWN + 8 * them
+                board[cap_sq] = 0
+                bb[cap_code] ^= 1 << cap_sq
+                occ[them] ^= 1 << cap_sq
+                key ^= Z_PIECE[cap_code][cap_sq]
+                mg -= mg_t[cap_code * 64 + cap_sq]
+                eg -= eg_t[cap_code * 64 + cap_sq]
+                pawn_key ^= Z_PIECE[cap_code][cap_sq]
+            elif promo:
+                placed = promo + 8 * us
+                phase += ph_t[placed] - ph_t[piece]
+            elif to - fr == 16 or fr - to == 16:
+                ep = (fr + to) >> 1
+                if PAWN_ATTACKS[us][ep] & bb[PAWN + 8 * them]:
+                    self.ep = ep
+                    key ^= Z_EP[ep & 7]
+            if placed == piece:
+                pawn_key ^= Z_PIECE[piece][to]
+        elif pt == KING and (to - fr == 2 or fr - to == 2):
+            if to > fr:
+                rook_from, rook_to = to + 1, to - 1
+            else:
+                rook_from, rook_to = to - 2, to + 1
+            rook = ROOK + 8 * us
+            board[rook_from] = 0
+            board[rook_to] = rook
+            rook_bb = (1 << rook_from) | (1 << rook_to)
+            bb[rook] ^= rook_bb
+            occ[us] ^= rook_bb
+            key ^= Z_PIECE[rook][rook_from] ^ Z_PIECE[rook][rook_to]
+            mg += mg_t[rook * 64 + rook_to] - mg_t[rook * 64 + rook_from]
+            eg += eg_t[rook * 64 + rook_to] - eg_t[rook * 64 + rook_from]
+
+        board[to] = placed
+        bb[placed] ^= to_bb
+        occ[us] ^= to_bb
+        key ^= Z_PIECE[placed][to]
+        self.mg = mg + mg_t[placed * 64 + to]
+        self.eg = eg + eg_t[placed * 64 + to]
+        self.phase = phase
+        self.pawn_key = pawn_key
+
+        self.castling &= CASTLE_MASK[fr] & CASTLE_MASK[to]
+        key ^= Z_CASTLE[self.castling]
+
+        self.occupied = occ[0] | occ[1]
+        self.turn = them
+        if them == WHITE:
+            self.fullmove += 1
+        self.key = key
+        if self.debug:
+            self._check_key()
+
+    def pop(self):
+        move, piece, captured, castling, ep, halfmove, key, self.mg, self.eg, self.phase, self.pawn_key = \
+            self.stack.pop()
+        self.keys.pop()
+        fr = move & 63
+        to = (move >> 6) & 63
+        board = self.board
+        bb = self.bb
+        occ = self.occ
+        them = self.turn
+        us = them ^ 1
+
+        placed = board[to]
+        from_bb = 1 << fr
+        to_bb = 1 << to
+        bb[placed] ^= to_bb
+        occ[us] ^= to_bb
+        board[to] = captured
+        if captured:
+            bb[captured] ^= to_bb
+            occ[them] ^= to_bb
+        board[fr] = piece
+        bb[piece] ^= from_bb
+        occ[us] ^= from_bb
+
+        pt = piece & 7
+        if pt == PAWN:
+            if to == ep:
+                cap_sq = to - 8 if us else to + 8
+                cap_code = PAWN + 8 * them
+                board[cap_sq] = cap_code
+                bb[cap_code] ^= 1 << cap_sq
+                occ[them] ^= 1 << cap_sq
+        elif pt == KING and (to - fr == 2 or fr - to == 2):
+            if to > fr:
+                rook_from, rook_to = to + 1, to - 1
+            else:
+                rook_from, rook_to = to - 2, to + 1
+            rook = ROOK + 8 * us
+            board[rook_to] = 0
+            board[rook_from] = rook
+            rook_bb = (1 << rook_from) | (1 << rook_to)
+            bb[rook] ^= rook_bb
+            occ[us] ^= rook_bb
+
+        self.occupied = occ[0] | occ[1]
+        self.turn = us
+        if them == WHITE:
+            self.fullmove -= 1
+        self.castling = castling
+        self.ep = ep
+        self.halfmove = halfmove
+        self.key = key
+        if self.debug:
+            self._check_key()
+        return move
+
+    def push_null(self):
+        """Nuoc di rong (null move): chi doi ben di. halfmove dat ve 0 de phat hien
+        lap lai khong nhin qua nuoc rong."""
+        self.stack.append((0, 0, 0, self.castling, self.ep, self.halfmove, self.key,
+                           self.mg, self.eg, self.phase, self.pawn_key))
+        self.keys.append(self.key)
+        key = self.key ^ Z_SIDE
+        if self.ep is not None:
+            key ^= Z_EP[self.ep & 7]
+            self.ep = None
+        self.key = key
+        self.halfmove = 0
+        if self.turn == BLACK:
+            self.fullmove += 1
+        self.turn ^= 1
+
+    def pop_null(self):
+        _, _, _, _, ep, halfmove, key, _, _, _, _ = self.stack.pop()
+        self.keys.pop()
+        self.turn ^= 1
+        if self.turn == BLACK:
+            self.fullmove -= 1
+        self.ep = ep
+        self.halfmove = halfmove
+        self.key = key
+
+    def _check_key(self):
+        assert (self.mg, self.eg, self.phase) == self.compute_accumulators(), \
+            f"Tong danh gia tang dan lech ({self.fen()})"
+        assert self.pawn_key == self.compute_pawn_key(), f"Khoa tot lech ({self.fen()})"
+        full = self.compute_key()
+        assert self.key == full, f"Zobrist lech: {self.key:x} != {full:x} ({self.fen()})"
+        assert full == chess.polyglot.zobrist_hash(self.to_board()), f"Zobrist khong khop Polyglot ({self.fen()})"
+
+    # ------------------------------------------------------------------
+    # Tan cong
+    # ------------------------------------------------------------------
+    def king_square(self, color):
+        return self.bb[KING + 8 * color].bit_length() - 1
+
+    def attackers_mask(self, color, sq, occupied=None):
+        """Bitboard cac quan mau color tan cong o sq."""
+        if occupied is None:
+            occupied = self.occupied
+        bb = self.bb
+        c = 8 * color
+        queens = bb[QUEEN + c]
+        return ((KNIGHT_ATTACKS[sq] & bb[KNIGHT + c]) |
+                (KING_ATTACKS[sq] & bb[KING + c]) |
+                (PAWN_ATTACKS[color ^ 1][sq] & bb[PAWN + c]) |
+                (bishop_attacks(sq, occupied) & (bb[BISHOP + c] | queens)) |
+                (rook_attacks(sq, occupied) & (bb[ROOK + c] | queens)))
+
+    def is_attacked(self, sq, color):
+        bb = self.bb
+        c = 8 * color
+        if KNIGHT_ATTACKS[sq] & bb[KNIGHT + c] or PAWN_ATTACKS[color ^ 1][sq] & bb[PAWN + c] or \
+                KING_ATTACKS[sq] & bb[KING + c]:
+            return True
+        occupied = self.occupied
+        queens = bb[QUEEN + c]
+        return bool(bishop_attacks(sq, occupied) & (bb[BISHOP + c] | queens) or
+                    rook_attacks(sq, occupied) & (bb[ROOK + c] | queens))
+
+    def attacks_from(self, sq):
+        """Bitboard cac o ma quan tai sq tan cong (giong chess.Board.attacks)."""
+        code = self.board[sq]
+        pt = code & 7
+        if pt == PAWN:
+            return PAWN_ATTACKS[code >> 3][sq]
+        if pt == KNIGHT:
+            return KNIGHT_ATTACKS[sq]
+        if pt == KING:
+            return KING_ATTACKS[sq]
+        if pt == BISHOP:
+            return bishop_attacks(sq, self.occupied)
+        if pt == ROOK:
+            return rook_attacks(sq, self.occupied)
+        if pt == QUEEN:
+            return bishop_attacks(sq, self.occupied) | rook_attacks(sq, self.occupied)
+        return 0
+
+    def has_non_pawn_material(self, color):
+        """Con quan nao ngoai tot va vua khong (chong zugzwang cho null move)."""
+        c = 8 * color
+        bb = self.bb
+        return bool(bb[KNIGHT + c] | bb[BISHOP + c] | bb[ROOK + c] | bb[QUEEN + c])
+
+    def is_check(self):
+        return self.is_attacked(self.king_square(self.turn), self.turn ^ 1)
+
+    def checkers(self):
+        """Bitboard cac quan dang chieu vua ben di."""
+        return self.attackers_mask(self.turn ^ 1, self.king_square(self.turn))
+
+    def pinned(self):
+        """Bitboard cac quan cua ben di bi ghim vao vua."""
+        us = self.turn
+        them = us ^ 1
+        bb = self.bb
+        king = self.king_square(us)
+        queens = bb[QUEEN + 8 * them]
+        snipers = ((rook_attacks(king, 0) & (bb[ROOK + 8 * them] | queens)) |
+                   (bishop_attacks(king, 0) & (bb[BISHOP + 8 * them] | queens)))
+        pinned = 0
+        occupied = self.occupied
+        own = self.occ[us]
+        while snipers:
+            sniper_bb = snipers & -snipers
+            snipers ^= sniper_bb
+            blockers = BB_BETWEEN[king][sniper_bb.bit_length() - 1] & occupied
+            if blockers and not blockers & (blockers - 1) and blockers & own:
+                pinned |= blockers
+        return pinned
+
+    # ------------------------------------------------------------------
+    # Sinh nuoc di
+    # ------------------------------------------------------------------
+    def _piece_moves(self, append, mask):
+        """Nuoc cua ma, tuong, xe, hau, vua (khong gom nhap thanh) den cac o trong mask."""
+        bb = self.bb
+        c = 8 * self.turn
+        occupied = self.occupied
+        for pt in (KNIGHT, BISHOP, ROOK, QUEEN, KING):
+            pieces = bb[pt + c]
+            while pieces:
+                fr_bb = pieces & -pieces
+                pieces ^= fr_bb
+                fr = fr_bb.bit_length() - 1
+                if pt == KNIGHT:
+                    targets = KNIGHT_ATTACKS[fr]
+                elif pt == BISHOP:
+                    targets = bishop_attacks(fr, occupied)
+                elif pt == ROOK:
+                    targets = rook_attacks(fr, occupied)
+                elif pt == QUEEN:
+                    targets = bishop_attacks(fr, occupied) | rook_attacks(fr, occupied)
+                else:
+                    targets = KING_ATTACKS[fr]
+                targets &= mask
+                while targets:
+                    to_bb = targets & -targets
+                    targets ^= to_bb
+                    append(fr | ((to_bb.bit_length() - 1) << 6))
+
+    def generate_captures(self):
+        """Nuoc gia hop le 'on ao': an quan (ke ca an qua duong) va moi nuoc phong cap."""
+        moves = []
+        append = moves.append
+        us = self.turn
+        them = us ^ 1
+        enemy = self.occ[them]
+        empty = ~self.occupied & BB_ALL
+
+        pawns = self.bb[PAWN + 8 * us]
+        if us == WHITE:
+            push_promo = (pawns << 8) & empty & BB_BACKRANKS
+            cap_left = ((pawns & ~BB_FILE_A) << 7) & enemy
+            cap_right = ((pawns & ~BB_FILE_H) << 9) & enemy
+            steps = ((push_promo, -8), (cap_left, -7), (cap_right, -9))
+        else:
+            push_promo = (pawns >> 8) & empty & BB_BACKRANKS
+            cap_left = ((pawns & ~BB_FILE_A) >> 9) & enemy
+            cap_right = ((pawns & ~BB_FILE_H) >> 7) & enemy
+            steps = ((push_promo, 8), (cap_left, 9), (cap_right, 7))
+        for targets, delta in steps:
+            while targets:
+                to_bb = targets & -targets
+                to = to_bb.bit_length() - 1
+                targets ^= to_bb
+                fr = to + delta
+                if to_bb & BB_BACKRANKS:
+                    for promo in PROMOTIONS:
+                        append(fr | (to << 6) | (promo << 12))
+                else:
+                    append(fr | (to << 6))
+        if self.ep is not None:
+            ep = self.ep
+            attackers = PAWN_ATTACKS[them][ep] & pawns
+            while attackers:
+                fr_bb = attackers & -attackers
+                attackers ^= fr_bb
+                append((fr_bb.bit_length() - 1) | (ep << 6))
+
+        self._piece_moves(append, enemy)
+        return moves
+
+    def generate_quiets(self):
+        """Nuoc gia hop le yen tinh: khong an quan, khong phong cap (gom nhap thanh)."""
+        moves = []
+        append = moves.append
+        us = self.turn
+        them = us ^ 1
+        occupied = self.occupied
+        empty = ~occupied & BB_ALL
+
+        pawns = self.bb[PAWN + 8 * us]
+        if us == WHITE:
+            single = (pawns << 8) & empty
+            double = ((single & BB_RANK_3) << 8) & empty
+            steps = ((single & ~BB_BACKRANKS, -8), (double, -16))
+        else:
+            single = (pawns >> 8) & empty
+            double = ((single & BB_RANK_6) >> 8) & empty
+            steps = ((single & ~BB_BACKRANKS, 8), (double, 16))
+        for targets, delta in steps:
+            while targets:
+                to_bb = targets & -targets
+                to = to_bb.bit_length() - 1
+                targets ^= to_bb
+                append((to + delta) | (to << 6))
+
+        self._piece_moves(append, empty)
+
+        # Nhap thanh (kiem tra o vua di qua khong bi chieu)
+        if self.castling:
+            if us == WHITE:
+                if self.castling & WK and not occupied & (chess.BB_F1 | chess.BB_G1) and \
+                        not self.is_attacked(chess.E1, them) and not self.is_attacked(chess.F1, them) and \
+                        not self.is_attacked(chess.G1, them):
+                    append(chess.E1 | (chess.G1 << 6))
+                if self.castling & WQ and not occupied & (chess.BB_B1 | chess.BB_C1 | chess.BB_D1) and \
+                        not self.is_attacked(chess.E1, them) and not self.is_attacked(chess.D1, them) and \
+                        not self.is_attacked(chess.C1, them):
+                    append(chess.E1 | (chess.C1 << 6))
+            else:
+                if self.castling & BK and not occupied & (chess.BB_F8 | chess.BB_G8) and \
+                        not self.is_attacked(chess.E8, them) and not self.is_attacked(chess.F8, them) and \
+                        not self.is_attacked(chess.G8, them):
+                    append(chess.E8 | (chess.G8 << 6))
+                if self.castling & BQ and not occupied & (chess.BB_B8 | chess.BB_C8 | chess.BB_D8) and \
+                        not self.is_attacked(chess.E8, them) and not self.is_attacked(chess.D8, them) and \
+                        not self.is_attacked(chess.C8, them):
+                    append(chess.E8 | (chess.C8 << 6))
+        return moves
+
+    def pseudo_legal_moves(self):
+        return self.generate_captures() + self.generate_quiets()
+
+    def is_pseudo_legal(self, move):
+        """Nuoc di (vd. lay tu TT, killer, counter-move) co phai nuoc gia hop le o vi tri
+        nay khong, kiem tra truc tiep ma khong can sinh danh sach nuoc."""
+        if not move:
+            return False
+        fr = move & 63
+        to = (move >> 6) & 63
+        promo = move >> 12
+        piece = self.board[fr]
+        us = self.turn
+        if not piece or piece >> 3 != us:
+            return False
+        target = self.board[to]
+        if target and target >> 3 == us:
+            return False
+        pt = piece & 7
+        to_bb = 1 << to
+        if pt == PAWN:
+            if bool(promo) != bool(to_bb & BB_BACKRANKS) or promo == PAWN or promo > QUEEN:
+                return False
+            step = 8 if us == WHITE else -8
+            if PAWN_ATTACKS[us][fr] & to_bb:
+                return bool(target) or to == self.ep
+            if target:
+                return False
+            if to == fr + step:
+                return True
+            start = BB_RANK_3 >> 8 if us == WHITE else BB_RANK_6 << 8
+            return to == fr + 2 * step and bool((1 << fr) & start) and not self.board[fr + step]
+        if promo:
+            return False
+        if pt == KING and (to - fr == 2 or fr - to == 2):
+            return move in self.generate_quiets()
+        return bool(self.attacks_from(fr) & to_bb)
+
+    def is_legal(self, move, pinned=None, checkers=None):
+        """Nuoc di gia hop le co hop le khong. pinned/checkers tinh mot lan moi node
+        (pinned(), checkers()) de di duong nhanh: khong bi chieu + quan khong bi ghim
+        thi hop le ngay; quan bi ghim chi duoc di tren duong ghim; khi bi chieu don
+        thi phai an quan chieu hoac chan. Vua, en passant va chieu doi dung make/unmake."""
+        if pinned is None:
+            pinned = self.pinned()
+        if checkers is None:
+            checkers = self.checkers()
+        fr = move & 63
+        to = (move >> 6) & 63
+        pt = self.board[fr] & 7
+        if pt == KING:
+            if not checkers:
+                # nhap thanh da kiem tra o vua di qua luc sinh nuoc
+                return to - fr == 2 or fr - to == 2 or not self.is_attacked(to, self.turn ^ 1)
+        elif pt != PAWN or to != self.ep:
+            from_bb = 1 << fr
+            if not checkers:
+                return not pinned & from_bb or bool(BB_RAYS[self.king_square(self.turn)][fr] >> to & 1)
+            if checkers & (checkers - 1):
+                return False # chieu doi: chi vua duoc di
+            if pinned & from_bb:
+                return False
+            king = self.king_square(self.turn)
+            return bool((BB_BETWEEN[king][checkers.bit_length() - 1] | checkers) >> to & 1)
+        us = self.turn
+        self.push(move)
+        legal = not self.is_attacked(self.king_square(us), us ^ 1)
+        self.pop()
+        return legal
+
+    def legal_moves(self):
+        pinned = self.pinned()
+        checkers = self.checkers()
+        return [m for m in self.pseudo_legal_moves() if self.is_legal(m, pinned, checkers)]
+
+    def has_legal_move(self):
+        pinned = self.pinned()
+        checkers = self.checkers()
+        for m in self.pseudo_legal_moves():
+            if self.is_legal(m, pinned, checkers):
+                return True
+        return False
+
+    # ------------------------------------------------------------------
+    # Thong tin nuoc di
+    # ------------------------------------------------------------------
+    def is_capture(self, move):
+        to = (move >> 6) & 63
+        return bool(self.board[to]) or (to == self.ep and self.board[move & 63] & 7 == PAWN)
+
+    def is_castling(self, move):
+        fr = move & 63
+        to = (move >> 6) & 63
+        return self.board[fr] & 7 == KING and (to - fr == 2 or fr - to == 2)
+
+    # ------------------------------------------------------------------
+    # Trao doi quan (SEE) tren bitboard: khong push/pop, khong sinh nuoc
+    # ------------------------------------------------------------------
+    def _see_attackers(self, sq, occupied):
+        """Bitboard quan ca hai mau tan cong sq voi occupancy cho truoc."""
+        bb = self.bb
+        bishops = bb[BISHOP] | bb[BISHOP + 8] | bb[QUEEN] | bb[QUEEN + 8]
+        rooks = bb[ROOK] | bb[ROOK + 8] | bb[QUEEN] | bb[QUEEN + 8]
+        return ((PAWN_ATTACKS[BLACK][sq] & bb[PAWN + 8]) |
+                (PAWN_ATTACKS[WHITE][sq] & bb[PAWN]) |
+                (KNIGHT_ATTACKS[sq] & (bb[KNIGHT] | bb[KNIGHT + 8])) |
+                (KING_ATTACKS[sq] & (bb[KING] | bb[KING + 8])) |
+                (bishop_attacks(sq, occupied) & bishops) |
+                (rook_attacks(sq, occupied) & rooks)) & occupied
+
+    def _see_start(self, move):
+        """(gia tri quan bi an, occupancy sau nuoc dau, o dich)."""
+        fr = move & 63
+        to = (move >> 6) & 63
+        occupied = self.occupied ^ (1 << fr)
+        victim = self.board[to] & 7
+        if not victim and to == self.ep and self.board[fr] & 7 == PAWN:
+            victim = PAWN
+            occupied ^= 1 << (to - 8 if self.turn == WHITE else to + 8)
+        return victim, occupied | (1 << to), to
+
+    def see(self, move, values=SEE_VALUES):
+        """Ket qua trao doi vat chat tai o dich cua move (goc nhin ben di), dung danh
+        sach swap: moi ben lan luot an bang quan re nhat, quan truot dung sau quan vua
+        an duoc phat hien lai (x-ray). Khong xet ghim."""
+        if self.is_castling(move):
+            return 0
+        victim, occupied, to = self._see_start(move)
+        bb = self.bb
+        occ = self.occ
+        bishops = bb[BISHOP] | bb[BISHOP + 8] | bb[QUEEN] | bb[QUEEN + 8]
+        rooks = bb[ROOK] | bb[ROOK + 8] | bb[QUEEN] | bb[QUEEN + 8]
+        attackers = self._see_attackers(to, occupied)
+        gain = [values[victim]]
+        piece_value = values[self.board[move & 63] & 7] # quan dang dung tren o dich
+        stm = self.turn ^ 1
+        while True:
+            stm_attackers = attackers & occ[stm]
+            if not stm_attackers:
+                break
+            c = 8 * stm
+            for pt in (PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING):
+                lva = stm_attackers & bb[pt + c]
+                if lva:
+                    break
+            if pt == KING and attackers & occ[stm ^ 1]:
+                break # vua khong duoc an vao o con bi tan cong
+            gain.append(piece_value - gain[-1])
+            piece_value = values[pt]
+            occupied ^= lva & -lva
+            if pt == PAWN or pt == BISHOP or pt == QUEEN:
+                attackers |= bishop_attacks(to, occupied) & bishops
+            if pt == ROOK or pt == QUEEN:
+                attackers |= rook_attacks(to, occupied) & rooks
+            attackers &= occupied
+            stm ^= 1
+        for d in range(len(gain) - 1, 0, -1):
+            gain[d - 1] = -max(-gain[d - 1], gain[d])
+        return gain[0]
+
+    def see_ge(self, move, margin=0, values=SEE_VALUES):
+        """see(move) >= margin, nhung dung som ngay khi ket qua da chac chan."""
+        if self.is_castling(move):
+            return margin <= 0
+        victim, occupied, to = self._see_start(move)
+        swap = values[victim] - margin
+        if swap < 0:
+            return False
+        swap = values[self.board[move & 63] & 7] - swap
+        if swap <= 0:
+            return True
+        bb = self.bb
+        occ = self.occ
+        bishops = bb[BISHOP] | bb[BISHOP + 8] | bb[QUEEN] | bb[QUEEN + 8]
+        rooks = bb[ROOK] | bb[ROOK + 8] | bb[QUEEN] | bb[QUEEN + 8]
+        attackers = self._see_attackers(to, occupied)
+        stm = self.turn
+        res = 1
+        while True:
+            stm ^= 1
+            attackers &= occupied
+            stm_attackers = attackers & occ[stm]
+            if not stm_attackers:
+                break
+            res ^= 1
+            c = 8 * stm
+            for pt in (PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING):
+                lva = stm_attackers & bb[pt + c]
+                if lva:
+                    break
+            if pt == KING:
+                # vua chi an duoc khi doi phuong khong con quan tan cong
+                return bool(res ^ 1 if attackers & occ[stm ^ 1] else res)
+            swap = values[pt] - swap
+            if swap < res:
+                break
+            occupied ^= lva & -lva
+            if pt == PAWN or pt == BISHOP or pt == QUEEN:
+                attackers |= bishop_attacks(to, occupied) & bishops
+            if pt == ROOK or pt == QUEEN:
+                attackers |= rook_attacks(to, occupied) & rooks
+        return bool(res)
+
+    # ------------------------------------------------------------------
+    # Trang thai ket thuc (cung ngu nghia voi chess.Board)
+    # ------------------------------------------------------------------
+    def is_insufficient_material(self):
+        """Ca hai ben deu khong du quan chieu het (cung ket qua voi
+        chess.Board.is_insufficient_material), chi xet chu ky vat chat tren bitboard:
+        chi con vua, vua + mot ma, hoac vua + cac tuong cung mau o."""
+        bb = self.bb
+        if bb[PAWN] | bb[PAWN + 8] | bb[ROOK] | bb[ROOK + 8] | bb[QUEEN] | bb[QUEEN + 8]:
+            return False
+        knights = bb[KNIGHT] | bb[KNIGHT + 8]
+        bishops = bb[BISHOP] | bb[BISHOP + 8]
+        if knights:
+            return not bishops and not knights & (knights - 1)
+        return not bishops & chess.BB_DARK_SQUARES or not bishops & chess.BB_LIGHT_SQUARES
+
+    def is_repetition_draw(self, ply):
+        """Luat hoa do lap lai dung trong tim kiem (ply = so nuoc tu root). Vi tri da
+        xuat hien tren duong tim kiem (tu root tro di) tinh la hoa ngay lan lap dau;
+        neu chi xuat hien trong lich su van truoc root thi can du 3 lan. Chi quet
+        nguoc den nuoc khong the dao nguoc gan nhat, moi lan 2 ply (cung ben di, it
+        nhat 4 ply moi co the lap)."""
+        keys = self.keys
+        key = self.key
+        n = len(keys)
+        root = n - ply
+        seen = 1
+        for i in range(n - 4, max(0, n - self.halfmove) - 1, -2):
+            if keys[i] == key:
+                if i >= root:
+                    return True
+                seen += 1
+                if seen >= 3:
+                    return True
+        return False
+
+    def perft(self, depth):
+        if depth == 0:
+            return 1
+        moves = self.legal_moves()
+        if depth == 1:
+            return len(moves)
+        nodes = 0
+        for m in moves:
+            self.push(m)
+            nodes += self.perft(depth - 1)
+            self.pop()
+        return nodes
@@ -0,0 +1,103 @@
+import time
+
+# So node giua hai lan doc dong ho trong tim kiem (~10-30 ms o toc do hien tai)
+CHECK_INTERVAL = 256
+# Phan bo thoi gian theo dong ho van dau
+DEFAULT_MOVES_TO_GO = 30     # so nuoc gia dinh con lai khi khong co moves_to_go
+INCREMENT_SHARE = 0.75       # phan increment duoc tieu moi nuoc
+HARD_FACTOR = 4.0            # gioi han cung = HARD_FACTOR * gioi han mem ...
+MAX_TIME_SHARE = 0.4         # ... nhung khong qua ty le nay cua thoi gian con lai
+MOVE_OVERHEAD = 0.05         # du tru (giay) cho GUI / tre he thong
+# Du doan vong lap: thoi gian vong sau ~ thoi gian vong truoc * EBF
+DEFAULT_EBF = 3.0
+MAX_EBF = 8.0
+# Nuoc tot nhat khong doi qua STABLE_ITERATIONS vong thi dung khi da dung STABLE_SHARE gioi han mem
+STABLE_ITERATIONS = 4
+STABLE_SHARE = 0.3
+
+
+class TimeManager:
+    """Quan ly thoi gian cho mot lan tim kiem, dung dong ho monotonic.
+
+    Voi dong ho van dau (time_left, increment, moves_to_go) chia ra gioi han mem
+    (khong bat dau vong lap moi sau moc nay) va gioi han cung (dung tim kiem ngay).
+    Chi co time_limit (giay moi nuoc) thi hai gioi han bang nhau; neu co ca hai,
+    time_limit chan tren ca hai. Khong co gioi han nao thi tim den khi het do sau.
+
+    node_limit (so node) va cpu_limit (giay CPU cua tien trinh, time.process_time)
+    la cac gioi han cung them vao, khong phu thuoc tai cua may: chi phi moi nuoc
+    on dinh khi nhieu van dau chay chung mot may."""
+
+    def __init__(self, time_limit=None, time_left=None, increment=0.0, moves_to_go=None,
+                 node_limit=None, cpu_limit=None):
+        self.set_limits(time_limit, time_left, increment, moves_to_go, node_limit, cpu_limit)
+
+    def set_limits(self, time_limit=None, time_left=None, increment=0.0, moves_to_go=None,
+                   node_limit=None, cpu_limit=None):
+        """Dat lai gioi han va moc thoi gian bat dau (dung ca khi ponderhit)."""
+        self.start = time.monotonic()
+        self.cpu_start = time.process_time()
+        self.node_limit = node_limit
+        self.cpu_limit = cpu_limit
+        self.soft = self.hard = None
+        if time_left is not None:
+            usable = max(0.0, time_left - MOVE_OVERHEAD)
+            soft = usable / (moves_to_go or DEFAULT_MOVES_TO_GO) + INCREMENT_SHARE * increment
+            self.hard = min(HARD_FACTOR * soft, MAX_TIME_SHARE * usable + increment, usable)
+            self.soft = min(soft, self.hard)
+        if time_limit is not None:
+            self.soft = time_limit if self.soft is None else min(self.soft, time_limit)
+            self.hard = time_limit if self.hard is None else min(self.hard, time_limit)
+        self.iteration_times = []  # thoi gian cua tung vong lap hoan thanh
+        self.best_move = None
+        self.stable_iterations = 0
+
+    def elapsed(self):
+        return time.monotonic() - self.start
+
+    def cpu_elapsed(self):
+        return time.process_time() - self.cpu_start
+
+    def hard_exceeded(self):
+        return self.hard is not None and self.elapsed() >= self.hard
+
+    def limit_reached(self, nodes):
+        """Mot gioi han cung bat ky (thoi gian thuc, node, CPU) da bi vuot."""
+        return (self.node_limit is not None and nodes >= self.node_limit) or \
+            (self.cpu_limit is not None and self.cpu_elapsed() >= self.cpu_limit) or \
+            self.hard_exceeded()
+
+    def iteration_done(self, elapsed, best_move):
+        """Ghi nhan mot vong lap hoan thanh (elapsed tinh tu luc bat dau tim kiem)."""
+        self.iteration_times.append(elapsed - sum(self.iteration_times))
+        if best_move == self.best_move:
+            self.stable_iterations += 1
+        else:
+            self.best_move = best_move
+            self.stable_iterations = 0
+
+    def predicted_iteration_time(self):
+        """Uoc luong thoi gian vong lap tiep theo = vong truoc * he so phan nhanh hieu dung."""
+        times = self.iteration_times
+        if not times:
+            return 0.0
+        ebf = DEFAULT_EBF
+        if len(times) >= 2 and times[-2] > 0:
+            ebf = min(MAX_EBF, max(1.0, times[-1] / times[-2]))
+        return times[-1] * ebf
+
+    def should_start_iteration(self, nodes=0):
+        """False neu khong nen bat dau vong lap moi: da het ngan sach node / CPU, da qua
+        gioi han mem, nuoc tot nhat da on dinh, hoac vong lap du doan se khong xong
+        truoc gioi han cung."""
+        if (self.node_limit is not None and nodes >= self.node_limit) or \
+                (self.cpu_limit is not None and self.cpu_elapsed() >= self.cpu_limit):
+            return False
+        if self.hard is None:
+            return True
+        elapsed = self.elapsed()
+        if elapsed >= self.soft:
+            return False
+        if self.stable_iterations >= STABLE_ITERATIONS and elapsed >= STABLE_SHARE * self.soft:
+            return False
+        return elapsed + self.predicted_iteration_time() < self.hard